@@ -0,0 +1,257 @@
+"""Alpha-beta search for the two-knight games, as a drop-in knight policy.
+
+Both knights move in the search (a stuck knight passes; the game ends when
+neither can move), unlike the one-knight mobility lookaheads. A node's value
+is the margin the side to move can force from there: MOVE_VALUE per move it
+makes minus MOVE_VALUE per move the opponent makes, plus an evaluation of
+the position where the depth runs out. MOVE_VALUE outweighs every
+evaluation, so a move actually made always counts for more than a better
+looking position. Evaluations, from the side to move:
+
+    mobility  legal moves minus the opponent's
+    degree    onward moves summed over the legal moves (the Warnsdorff
+              degree of every option) minus the opponent's
+    region    squares the knight reaches before the opponent minus the
+              opponent's (regions.region_score, which respects crossings)
+
+The search is negamax with alpha-beta and iterative deepening from depth 1.
+Moves are ordered with the transposition table move first, then the two
+killer moves of the ply, then by history score (depth squared added on
+every cutoff). The table holds exact Zobrist keys (ZobristDuelState). It
+lasts as long as the AlphaBeta object, so each decision reuses the
+previous one's tree. With a time budget the deepening stops when the budget
+runs out, and the best move of the last finished depth is played. An
+iteration that never reaches its depth limit has solved the position, and
+deepening stops there too.
+
+AlphaBeta.choose(state, side) fits the DuelState duel loops
+(lookahead_3ply.duel_once); choose_index has choose_3ply's signature for
+trap_sim_v1.simulate_two_knights. The command line plays either experiment
+with the engine as Knight 2:
+
+    python alphabeta.py trap --depth 4 --eval region --trials 200
+    python alphabeta.py duel --depth 6 --budget 0.05 --trials 200
+"""
+
+import argparse
+import sys
+import time
+from functools import partial
+
+from regions import region_score
+from transposition import TranspositionTable, ZobristDuelState
+from trial_runner import make_rng, run_trials
+
+EXACT, LOWER, UPPER = 0, 1, 2
+MOVE_VALUE = 100
+INFINITY = 1 << 30
+SOLVED = 1 << 10    # table depth of values that no depth limit affected
+
+# --- Evaluations ---
+
+def eval_mobility(state, side):
+    return len(state.legal_moves(side)) - len(state.legal_moves(1 - side))
+
+def eval_degree(state, side):
+    def degree(s):
+        return sum(state.mobility_after(s, m) for m in state.legal_moves(s))
+    return degree(side) - degree(1 - side)
+
+EVALUATIONS = {"mobility": eval_mobility, "degree": eval_degree, "region": region_score}
+
+# --- Engine ---
+
+class _Timeout(Exception):
+    pass
+
+class AlphaBeta:
+    """Iterative-deepening alpha-beta policy.
+
+    depth is the most plies searched (None: until solved or out of time),
+    evaluate an EVALUATIONS name or a function (state, side) -> int, and
+    time_budget the seconds allowed per move (None: no limit).
+    """
+
+    def __init__(self, depth=4, evaluate="mobility", time_budget=None, table_bits=16):
+        if depth is None and time_budget is None:
+            raise ValueError("need a depth limit or a time budget")
+        self.depth = depth
+        self.evaluate = EVALUATIONS[evaluate] if isinstance(evaluate, str) else evaluate
+        self.time_budget = time_budget
+        self.table = TranspositionTable(table_bits)
+        self.history = {}
+        self.killers = []
+        self.nodes = 0
+        self.completed_depth = 0
+        self._deadline = None
+        self._horizon_hit = False
+
+    def choose(self, state, side, rng=None, **kwargs):
+        """Best move for side in a DuelState, or None if it has no move."""
+        if not isinstance(state, ZobristDuelState):
+            state = _hashed_copy(state)
+        moves = state.legal_moves(side)
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+        self._deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+        # Old history scores still order moves, but recent cutoffs count more
+        for key in self.history:
+            self.history[key] //= 2
+        free = state.board.size - bin(state.visited).count("1")
+        max_depth = free if self.depth is None else min(self.depth, free)
+        best = moves[0]
+        self.completed_depth = 0
+        for depth in range(1, max_depth + 1):
+            # Passes add plies without using depth
+            self.killers = [[None, None] for _ in range(2 * depth + 1)]
+            self._horizon_hit = False
+            try:
+                self._negamax(state, side, depth, -INFINITY, INFINITY, 0)
+            except _Timeout:
+                break
+            entry = self.table.probe(state.key(side))
+            if entry is not None and entry[1][2] is not None:
+                best = entry[1][2]
+            self.completed_depth = depth
+            if not self._horizon_hit:
+                break
+        return best
+
+    def choose_index(self, pos, opp_pos, visited, adj, rng=None):
+        """choose_3ply's interface: square indices and a visited mask, plain game."""
+        coords = adj.coords
+        state = ZobristDuelState(coords[pos], coords[opp_pos], adj.m, adj.n, adj.deltas, non_crossing=False)
+        state.visited = visited
+        state.rehash()
+        move = self.choose(state, 0)
+        return None if move is None else adj.index[move]
+
+    def _ordered(self, moves, origin, mover, tt_move, ply):
+        killers = self.killers[ply]
+        history = self.history
+        return sorted(moves, key=lambda m: (m != tt_move, m not in killers, -history.get((mover, origin, m), 0)))
+
+    def _negamax(self, state, mover, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self._deadline is not None and not self.nodes & 63 and time.perf_counter() > self._deadline:
+            raise _Timeout
+        key = state.key(mover)
+        entry = self.table.probe(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, (value, flag, tt_move) = entry
+            if entry_depth >= depth and (
+                    flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)):
+                if entry_depth < SOLVED:
+                    self._horizon_hit = True
+                return value
+        other = 1 - mover
+        moves = state.legal_moves(mover)
+        if not moves and not state.legal_moves(other):
+            return 0
+        if depth == 0:
+            self._horizon_hit = True
+            return self.evaluate(state, mover)
+        if not moves:
+            # Pass: a stuck knight stays stuck, so this costs no depth
+            return -self._negamax(state, other, depth, -beta, -alpha, ply + 1)
+
+        # Entries of subtrees that never reached the horizon are stored as
+        # solved and serve searches of any depth
+        outer_hit, self._horizon_hit = self._horizon_hit, False
+        origin = state.pos(mover)
+        best_value, best_move = -INFINITY, None
+        a = alpha
+        for m in self._ordered(moves, origin, mover, tt_move, ply):
+            state.make_move(mover, m)
+            try:
+                # value = MOVE_VALUE - child, so the child's window is MOVE_VALUE - beta, MOVE_VALUE - a
+                value = MOVE_VALUE - self._negamax(state, other, depth - 1, MOVE_VALUE - beta, MOVE_VALUE - a,
+                                                   ply + 1)
+            finally:
+                state.unmake_move()
+            if value > best_value:
+                best_value, best_move = value, m
+                if value > a:
+                    a = value
+                    if a >= beta:
+                        killers = self.killers[ply]
+                        if m != killers[0]:
+                            killers[1], killers[0] = killers[0], m
+                        self.history[(mover, origin, m)] = self.history.get((mover, origin, m), 0) + depth * depth
+                        break
+        flag = UPPER if best_value <= alpha else LOWER if best_value >= beta else EXACT
+        self.table.store(key, depth if self._horizon_hit else SOLVED, (best_value, flag, best_move))
+        self._horizon_hit = outer_hit or self._horizon_hit
+        return best_value
+
+def _hashed_copy(state):
+    board = state.board
+    copy = ZobristDuelState(state.paths[0][0], state.paths[1][0], board.m, board.n, board.deltas,
+                            non_crossing=state.edges is not None)
+    for side in (0, 1):
+        for sq in state.paths[side][1:]:
+            copy.make_move(side, sq)
+    return copy
+
+# --- Experiments ---
+
+def trap_trial(trial, seed, depth, evaluate, time_budget):
+    """trap_sim_v1's trial with the engine as Knight 2 against choose_3ply."""
+    import trap_sim_v1
+    adjacency = trap_sim_v1.build_knight_adjacency(8)
+    squares = list(range(adjacency.size))
+    rng = make_rng(seed, "starts")
+    start1 = rng.choice(squares)
+    start2 = rng.choice([s for s in squares if s != start1])
+    trap_sim_v1.freq_counter.clear()
+    trap_sim_v1.WEIGHT_MAP = None
+    engine = AlphaBeta(depth, evaluate, time_budget)
+    seq1, seq2 = trap_sim_v1.simulate_two_knights(
+        adjacency, start1, start2, make_rng(seed, "k1", trap_sim_v1.TIE_STRATEGY), None,
+        choose2=engine.choose_index)
+    return len(seq1) - 1, len(seq2) - 1
+
+def duel_trial(trial, seed, depth, evaluate, time_budget):
+    """lookahead_3ply's trial with the engine as Knight 2 against max-mobility."""
+    import lookahead_3ply
+    rng = make_rng(seed, "starts")
+    while True:
+        k1_start = lookahead_3ply.random_square(rng)
+        k2_start = lookahead_3ply.random_square(rng)
+        if k1_start != k2_start:
+            break
+    engine = AlphaBeta(depth, evaluate, time_budget)
+    return lookahead_3ply.duel_once(k1_start, k2_start, k2_policy=engine.choose)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play an experiment with the alpha-beta engine as Knight 2.")
+    parser.add_argument("experiment", choices=["trap", "duel"],
+                        help="trap: plain game against choose_3ply; duel: non-crossing game against max-mobility")
+    parser.add_argument("--depth", type=int, default=4, help="plies; 0 searches until solved or out of time")
+    parser.add_argument("--eval", default="mobility", choices=list(EVALUATIONS))
+    parser.add_argument("--budget", type=float, default=None, help="seconds per move")
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    trial = trap_trial if args.experiment == "trap" else duel_trial
+    func = partial(trial, depth=args.depth or None, evaluate=args.eval, time_budget=args.budget)
+    t0 = time.time()
+    outcomes = run_trials(func, args.trials, seed=args.seed, experiment=f"alphabeta_{args.experiment}",
+                          workers=args.workers)
+    results = list(outcomes.elements())
+    win_k1 = sum(1 for k1, k2 in results if k1 > k2)
+    win_k2 = sum(1 for k1, k2 in results if k2 > k1)
+    print(f"Knight 2: alpha-beta, depth {args.depth or 'unlimited'}, {args.eval} evaluation"
+          + (f", {args.budget}s per move" if args.budget else ""))
+    print(f"Average moves: Knight 1 {sum(k1 for k1, _ in results) / args.trials:.2f}, "
+          f"Knight 2 {sum(k2 for _, k2 in results) / args.trials:.2f}")
+    print(f"Knight 1 win%: {100.0 * win_k1 / args.trials:.2f}")
+    print(f"Knight 2 win%: {100.0 * win_k2 / args.trials:.2f}")
+    print(f"Draw%:        {100.0 * (args.trials - win_k1 - win_k2) / args.trials:.2f}")
+    print(f"{time.time() - t0:.1f}s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Benchmarks for the hot paths, with JSON baselines.
+
+Each benchmark is a setup function registered with @benchmark; it builds its
+inputs and returns a zero-argument callable, so only that call is timed. The
+loop count is calibrated with timeit's autorange and the best and median of
+--repeat runs are recorded per call. Positions for the duel benchmarks come
+from a fixed seed, so every run times the same work.
+
+    python benchmarks.py run                       # print results
+    python benchmarks.py run --save                # also write benchmarks.json
+    python benchmarks.py run -k duel --output new.json
+    python benchmarks.py compare                   # run now, compare to benchmarks.json
+    python benchmarks.py compare old.json new.json --threshold 0.2
+
+compare flags every benchmark whose best time grew by more than the threshold
+(default 10%) and exits with status 1 if there are any. Benchmarks whose module
+cannot be imported here (dfs_knight_path needs pygame) are reported as skipped,
+not missing, and never count as regressions.
+
+Refresh the baseline with run --save whenever a change moves the timings, and
+compare on an otherwise idle machine: best times on a busy one vary by tens of
+percent from run to run.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+
+from duel_state import DuelState
+from knight_board import get_board
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks.json")
+DEFAULT_THRESHOLD = 0.10
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def _midgame_state(size, plies, seed=0, non_crossing=True):
+    """DuelState after plies max-mobility moves per side, both sides still able to move.
+
+    Starts are drawn from seed, seed + 1, ... until such a position turns up.
+    """
+    for attempt in itertools.count(seed):
+        rng = random.Random(attempt)
+        squares = [(r, c) for r in range(size) for c in range(size)]
+        k1_start, k2_start = rng.sample(squares, 2)
+        state = DuelState(k1_start, k2_start, size, non_crossing=non_crossing)
+        for _ in range(plies):
+            for side in (0, 1):
+                moves = state.legal_moves(side)
+                if moves:
+                    state.make_move(side, max(moves, key=lambda m: state.mobility_after(side, m)))
+        if len(state.legal_moves(0)) >= 2 and len(state.legal_moves(1)) >= 2:
+            return state
+
+# --- Paths and mazes ---
+
+@benchmark("num_knight_paths[8]")
+def bench_num_knight_paths_8():
+    from knight_square_to_square import num_knight_paths
+    return lambda: num_knight_paths(8, (0, 0), (7, 7))
+
+@benchmark("num_knight_paths[64]")
+def bench_num_knight_paths_64():
+    from knight_square_to_square import num_knight_paths
+    return lambda: num_knight_paths(64, (0, 0), (63, 63))
+
+@benchmark("num_knight_paths_large[1000]")
+def bench_num_knight_paths_large():
+    from knight_square_to_square import num_knight_paths_large
+    return lambda: num_knight_paths_large(1000, (0, 0), (999, 999))
+
+@benchmark("min_moves_and_dist_matrix[8]")
+def bench_min_moves_8():
+    from knights_maze_v1 import min_moves_and_dist_matrix
+    return lambda: min_moves_and_dist_matrix(8, 8, (0, 0), (7, 7))
+
+@benchmark("min_moves_and_dist_matrix[16]")
+def bench_min_moves_16():
+    from knights_maze_v1 import min_moves_and_dist_matrix
+    return lambda: min_moves_and_dist_matrix(16, 16, (0, 0), (15, 15))
+
+@benchmark("find_knight_path_exact_x[8]")
+def bench_exact_path_8():
+    from knights_maze_v1 import find_knight_path_exact_x
+    def run():
+        random.seed(0)
+        return find_knight_path_exact_x(8, 8, (0, 0), (7, 7), 12)
+    return run
+
+@benchmark("find_knight_path_exact_x[16]")
+def bench_exact_path_16():
+    from knights_maze_v1 import find_knight_path_exact_x
+    def run():
+        random.seed(0)
+        return find_knight_path_exact_x(16, 16, (0, 0), (15, 15), 20)
+    return run
+
+@benchmark("dfs_knight_path[8]")
+def bench_dfs_knight_path():
+    # maze_pygame_modes_v5 needs pygame; the benchmark is skipped without it
+    from maze_pygame_modes_v5 import dfs_knight_path, maze_params
+    n, min_len, max_len = maze_params(8)
+    return lambda: dfs_knight_path((0, 0), (7, 7), n, min_len, max_len)
+
+@benchmark("generate_game_board[8]")
+def bench_generate_game_board():
+    from knights_maze_v1 import generate_game_board
+    def run():
+        random.seed(0)
+        return generate_game_board(8, 8, verbose=False)
+    return run
+
+# --- Duel move generation and heuristics ---
+
+@benchmark("legal_moves[16,long]")
+def bench_legal_moves_long():
+    # Long segment lists: 16x16 game 25 moves per side in
+    state = _midgame_state(16, 25)
+    return lambda: (state.legal_moves(0), state.legal_moves(1))
+
+def _register_heuristics():
+    import non_crossing_heuristics_test as nch
+    for name in sorted(vars(nch)):
+        if name.startswith("heuristic_"):
+            def setup(func=getattr(nch, name)):
+                state = _midgame_state(8, 6)
+                rng = random.Random(0)
+                return lambda: func(state, 1, rng)
+            benchmark(f"{name}[8]")(setup)
+
+_register_heuristics()
+
+@benchmark("metaheuristic[8]")
+def bench_metaheuristic():
+    from noncrossing_metaheuristic import metaheuristic
+    state = _midgame_state(8, 6)
+    rng = random.Random(0)
+    return lambda: metaheuristic(state, 1, rng)
+
+@benchmark("choose_3ply[8]")
+def bench_choose_3ply():
+    import trap_sim_v1
+    adj = get_board(8, 8)
+    state = _midgame_state(8, 12, non_crossing=False)
+    pos, opp_pos = adj.index[state.pos(0)], adj.index[state.pos(1)]
+    rng = random.Random(0)
+    return lambda: trap_sim_v1.choose_3ply(pos, opp_pos, state.visited, adj, rng)
+
+# --- Full games ---
+
+@benchmark("duel_once[8,max_mobility-vs-warnsdorff]")
+def bench_duel_8():
+    import non_crossing_heuristics_test as nch
+    def run():
+        return nch.duel_once((0, 0), (7, 7), nch.heuristic_warnsdorff, random.Random(1), random.Random(2))
+    return run
+
+@benchmark("duel_once[8,metaheuristic]")
+def bench_duel_metaheuristic():
+    import noncrossing_metaheuristic as meta
+    return lambda: meta.duel_once((0, 0), (7, 7), random.Random(1), random.Random(2))
+
+@benchmark("duel_once[8,lookahead_3ply]")
+def bench_duel_lookahead():
+    import lookahead_3ply
+    return lambda: lookahead_3ply.duel_once((0, 0), (7, 7))
+
+@benchmark("duel_once[16,max_mobility]")
+def bench_duel_16():
+    import non_crossing_paths_test
+    return lambda: non_crossing_paths_test.duel_once((0, 0), (15, 15))
+
+@benchmark("simulate_two_knights[8]")
+def bench_trap_game():
+    import trap_sim_v1
+    adj = get_board(8, 8)
+    return lambda: trap_sim_v1.simulate_two_knights(adj, 0, 63, random.Random(1), random.Random(2))
+
+# --- Running and comparing ---
+
+def time_benchmark(func, repeat=5):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return {"best": min(times), "median": statistics.median(times), "loops": number, "repeat": repeat}
+
+def run_benchmarks(pattern=None, repeat=5, log=print, skipped=None):
+    """Time the benchmarks; the reasons for any skipped go into skipped by name."""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            func = setup()
+        except ImportError as e:
+            log(f"{name:<45} skipped ({e})")
+            if skipped is not None:
+                skipped[name] = str(e)
+            continue
+        results[name] = time_benchmark(func, repeat)
+        log(f"{name:<45} {format_time(results[name]['best']):>10} "
+            f"(median {format_time(results[name]['median'])}, {results[name]['loops']} loops)")
+    return results
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+def save_results(path, results):
+    with open(path, "w") as f:
+        json.dump({
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}",
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD, skipped=()):
+    """Print a comparison table and return the names of the regressions.
+
+    skipped maps the benchmarks that could not run now to the reason.
+    """
+    regressions = []
+    print(f"{'benchmark':<45} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name in sorted(set(baseline) | set(current)):
+        if name in skipped:
+            print(f"{name:<45} skipped ({skipped[name]})")
+            continue
+        if name not in current or name not in baseline:
+            side = "baseline" if name in baseline else "current run"
+            print(f"{name:<45} only in {side}")
+            continue
+        old, new = baseline[name]["best"], current[name]["best"]
+        change = new / old - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<45} {format_time(old):>10} {format_time(new):>10} {100 * change:>+7.1f}%{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmarks or compare results to a baseline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--output", help="write the results to this JSON file")
+    run.add_argument("--save", action="store_true", help=f"write the results to {os.path.basename(DEFAULT_BASELINE)}")
+    compare = sub.add_parser("compare")
+    compare.add_argument("baseline", nargs="?", default=DEFAULT_BASELINE)
+    compare.add_argument("current", nargs="?", help="results file; benchmarks are run now if omitted")
+    compare.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this")
+    compare.add_argument("--repeat", type=int, default=5)
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="relative slowdown of the best time counted as a regression")
+    sub.add_parser("list")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name in BENCHMARKS:
+            print(name)
+    elif args.command == "run":
+        results = run_benchmarks(args.pattern, args.repeat)
+        for path in filter(None, (args.output, args.save and DEFAULT_BASELINE)):
+            save_results(path, results)
+            print(f"Wrote {path}")
+    else:
+        baseline = load_results(args.baseline)
+        if args.pattern:
+            baseline = {name: result for name, result in baseline.items() if args.pattern in name}
+        skipped = {}
+        if args.current:
+            current = load_results(args.current)
+        else:
+            current = run_benchmarks(args.pattern, args.repeat, log=lambda line: None, skipped=skipped)
+        regressions = compare_results(baseline, current, args.threshold, skipped)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {100 * args.threshold:.0f}%")
+            return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
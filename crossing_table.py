@@ -0,0 +1,94 @@
+"""Precomputed crossing conflicts between knight segments.
+
+A knight segment joins two squares a knight move apart, so an m x n board has
+only about 4 * m * n undirected segments. Each gets an edge id, and for every
+edge we store a bitset of the edge ids it crosses. A non-crossing game then
+keeps one "blocked edges" int: drawing a segment ORs in its conflicts, and
+testing a candidate move is a single bit test.
+"""
+
+from knight_board import KNIGHT_MOVES, get_board
+
+def segments_cross(seg1, seg2):
+    def ccw(A,B,C):
+        return (C[1]-A[1])*(B[0]-A[0]) > (B[1]-A[1])*(C[0]-A[0])
+    A, B = (seg1[0],seg1[1]), (seg1[2],seg1[3])
+    C, D = (seg2[0],seg2[1]), (seg2[2],seg2[3])
+    if A == C or A == D or B == C or B == D:
+        return False
+    return (ccw(A,C,D) != ccw(B,C,D)) and (ccw(A,B,C) != ccw(A,B,D))
+
+def _crossing_patterns(deltas):
+    """For each delta d1, the (offset, d2) pairs whose segment crosses (0,0)->d1."""
+    patterns = {}
+    for d1 in deltas:
+        found = []
+        # A crossing segment starts within 2 squares of the 3x2 box of d1
+        for dr in range(-4, 5):
+            for dc in range(-4, 5):
+                for d2 in deltas:
+                    seg2 = (dr, dc, dr + d2[0], dc + d2[1])
+                    if segments_cross((0, 0, d1[0], d1[1]), seg2):
+                        found.append(((dr, dc), d2))
+        patterns[d1] = found
+    return patterns
+
+class CrossingTable:
+    """Edge ids and edge-conflict bitsets for every knight segment on a board."""
+
+    def __init__(self, m, n, deltas=KNIGHT_MOVES):
+        board = get_board(m, n, deltas)
+        self.board = board
+        self.edge_id = {}       # (square, square) in either order -> edge id
+        self.endpoints = []     # edge id -> (square, square)
+        for a in board.coords:
+            for b in board.neighbour_coords[a]:
+                if (a, b) not in self.edge_id:
+                    eid = len(self.endpoints)
+                    self.endpoints.append((a, b))
+                    self.edge_id[(a, b)] = eid
+                    self.edge_id[(b, a)] = eid
+        self.num_edges = len(self.endpoints)
+        self.edge_bits = [1 << e for e in range(self.num_edges)]
+
+        patterns = _crossing_patterns(board.deltas)
+        self.conflicts = []
+        for a, b in self.endpoints:
+            mask = 0
+            for (dr, dc), d2 in patterns[(b[0] - a[0], b[1] - a[1])]:
+                c = (a[0] + dr, a[1] + dc)
+                d = (c[0] + d2[0], c[1] + d2[1])
+                eid = self.edge_id.get((c, d))
+                if eid is not None:
+                    mask |= 1 << eid
+            self.conflicts.append(mask)
+
+        # Per-square views used by move generators: the (square, edge bit) of
+        # each knight move in delta order, and the conflicts of each move.
+        self.moves = {
+            a: tuple((b, self.edge_bits[self.edge_id[(a, b)]]) for b in board.neighbour_coords[a])
+            for a in board.coords
+        }
+        self.crossing = {
+            pair: self.conflicts[eid] for pair, eid in self.edge_id.items()
+        }
+
+    def blocked_by_path(self, path):
+        """Blocked-edge bitset for the segments of a path of (row, col) squares."""
+        blocked = 0
+        for i in range(len(path) - 1):
+            blocked |= self.crossing[(path[i], path[i + 1])]
+        return blocked
+
+_TABLES = {}
+
+def get_crossing_table(m, n=None, deltas=KNIGHT_MOVES):
+    """Cached CrossingTable for an m x n board (n defaults to m)."""
+    if n is None:
+        n = m
+    key = (m, n, tuple(deltas))
+    table = _TABLES.get(key)
+    if table is None:
+        table = CrossingTable(m, n, deltas)
+        _TABLES[key] = table
+    return table
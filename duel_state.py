@@ -0,0 +1,54 @@
+"""Incremental two-knight game state with make/unmake (do/undo) moves.
+
+Heuristics probe a move by making it, looking at the resulting position and
+unmaking it again, so nothing proportional to the path length is copied per
+candidate. Sides are 0 (Knight 1) and 1 (Knight 2); squares are (row, col).
+"""
+
+from crossing_table import get_crossing_table
+from knight_board import KNIGHT_MOVES, get_board
+
+class DuelState:
+    def __init__(self, k1_start, k2_start, m, n=None, deltas=KNIGHT_MOVES, non_crossing=True):
+        self.board = get_board(m, n, deltas)
+        # Without a crossing table this is the plain Knight's Trap game
+        self.edges = get_crossing_table(m, n, deltas) if non_crossing else None
+        self.paths = ([k1_start], [k2_start])
+        self.visited = self.board.bit[k1_start] | self.board.bit[k2_start]
+        self.blocked = 0
+        self._history = []
+
+    def pos(self, side):
+        return self.paths[side][-1]
+
+    def legal_moves(self, side):
+        """Unvisited squares side can jump to without crossing any drawn segment."""
+        pos = self.paths[side][-1]
+        visited = self.visited
+        bit = self.board.bit
+        if self.edges is None:
+            return [sq for sq in self.board.neighbour_coords[pos] if not visited & bit[sq]]
+        blocked = self.blocked
+        return [sq for sq, edge_bit in self.edges.moves[pos]
+                if not (visited & bit[sq] or blocked & edge_bit)]
+
+    def make_move(self, side, sq):
+        path = self.paths[side]
+        self._history.append((side, self.blocked))
+        if self.edges is not None:
+            self.blocked |= self.edges.crossing[(path[-1], sq)]
+        self.visited |= self.board.bit[sq]
+        path.append(sq)
+
+    def unmake_move(self):
+        """Undo the most recent make_move, whichever side made it."""
+        side, self.blocked = self._history.pop()
+        sq = self.paths[side].pop()
+        self.visited ^= self.board.bit[sq]
+
+    def mobility_after(self, side, sq):
+        """Number of moves side would have after moving to sq."""
+        self.make_move(side, sq)
+        count = len(self.legal_moves(side))
+        self.unmake_move()
+        return count
@@ -0,0 +1,187 @@
+"""Optional call counting and timing for the innermost move-generation code.
+
+Off by default, and then nothing is wrapped: the hot functions are the plain
+class methods and cost nothing extra. Setting KNIGHTS_INSTRUMENT to an output
+path before running a script turns it on:
+
+    KNIGHTS_INSTRUMENT=trap.folded python trap_sim_v1.py
+    python instrument.py -o trap.folded trap_sim_v1.py
+
+enable() then replaces each function in HOT_SPOTS with a wrapper that counts
+calls, adds up time and counts the candidate squares it tests (for
+DuelState.legal_moves each one is a visited check plus a test against the
+blocked-edge bitset, the work segments_cross used to do per segment pair).
+At exit a summary per function goes to stderr and the output file gets
+collapsed stacks ("frame;frame;frame microseconds" per line, self time only)
+for flamegraph.pl or speedscope.
+
+Counts are kept per process, so trial_runner runs every trial in-process
+while instrumentation is on.
+"""
+
+import argparse
+import atexit
+import importlib
+import os
+import runpy
+import sys
+import time
+from collections import Counter
+
+ENV_VAR = "KNIGHTS_INSTRUMENT"
+
+def _duel_candidates(state, side):
+    pos = state.paths[side][-1]
+    if state.edges is None:
+        return len(state.board.neighbour_coords[pos])
+    return len(state.edges.moves[pos])
+
+def _board_candidates(board, sq, blocked):
+    return len(board.neighbours[sq])
+
+# (module, class or None, function, candidate count from the call arguments or None)
+HOT_SPOTS = [
+    ("duel_state", "DuelState", "legal_moves", _duel_candidates),
+    ("duel_state", "DuelState", "make_move", None),
+    ("duel_state", "DuelState", "unmake_move", None),
+    ("duel_state", "DuelState", "mobility_after", None),
+    ("knight_board", "KnightBoard", "legal_moves", _board_candidates),
+    ("knight_board", "KnightBoard", "mobility", None),
+    ("crossing_table", None, "segments_cross", None),
+    ("crossing_table", "CrossingTable", "blocked_by_path", None),
+]
+
+_enabled = False
+_output = None
+_originals = []
+_calls = Counter()
+_seconds = Counter()
+_candidates = Counter()
+_stacks = Counter()          # collapsed stack -> self seconds
+_stack_names = {}
+_wrapper_codes = set()
+_active = []                 # per call in progress: [nested seconds, nested overhead, wrapper frame, stack]
+
+def enabled():
+    return _enabled
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def _collapsed_stack(frame, leaf):
+    # Caller frames of a hot spot call; inside another hot spot only the
+    # frames up to that call are walked and its stack is the prefix
+    parent = _active[-1] if _active else None
+    stop = parent[2] if parent else None
+    codes = []
+    while frame is not None and frame.f_back is not stop:
+        if frame.f_code not in _wrapper_codes:
+            codes.append(frame.f_code)
+        frame = frame.f_back
+    if parent is None and frame is not None:
+        codes.append(frame.f_code)
+    key = (parent[3] if parent else "", tuple(codes), leaf)
+    name = _stack_names.get(key)
+    if name is None:
+        frames = [_frame_name(code) for code in reversed(codes)] + [_frame_name(leaf)]
+        name = ";".join(([parent[3]] if parent else []) + frames)
+        _stack_names[key] = name
+    return name
+
+def _wrap(func, site, candidates):
+    perf_counter = time.perf_counter
+    leaf = func.__code__
+
+    def wrapper(*args, **kwargs):
+        t_enter = perf_counter()
+        frame = sys._getframe()
+        entry = [0.0, 0.0, frame, _collapsed_stack(frame.f_back, leaf)]
+        _active.append(entry)
+        t0 = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            t1 = perf_counter()
+            _active.pop()
+            # Nested wrappers' bookkeeping is not the function's own time
+            elapsed = t1 - t0 - entry[1]
+            _calls[site] += 1
+            _seconds[site] += elapsed
+            if candidates is not None:
+                _candidates[site] += candidates(*args)
+            _stacks[entry[3]] += elapsed - entry[0]
+            if _active:
+                parent = _active[-1]
+                parent[0] += elapsed
+                parent[1] += entry[1] + (t0 - t_enter) + (perf_counter() - t1)
+
+    _wrapper_codes.add(wrapper.__code__)
+    wrapper.__wrapped__ = func
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+def enable(output=None):
+    """Wrap every hot spot; output is the collapsed-stack file written at exit."""
+    global _enabled, _output
+    if _enabled:
+        return
+    for module_name, class_name, func_name, candidates in HOT_SPOTS:
+        module = importlib.import_module(module_name)
+        owner = module if class_name is None else getattr(module, class_name)
+        func = getattr(owner, func_name)
+        site = func_name if class_name is None else f"{class_name}.{func_name}"
+        _originals.append((owner, func_name, func))
+        setattr(owner, func_name, _wrap(func, site, candidates))
+    _enabled = True
+    _output = output
+    atexit.register(report)
+
+def disable():
+    """Put the original functions back; collected counts are kept."""
+    global _enabled
+    for owner, func_name, func in reversed(_originals):
+        setattr(owner, func_name, func)
+    _originals.clear()
+    _enabled = False
+
+def write_collapsed(path):
+    with open(path, "w") as f:
+        for stack, seconds in sorted(_stacks.items()):
+            micros = round(seconds * 1e6)
+            if micros:
+                f.write(f"{stack} {micros}\n")
+
+def report(file=sys.stderr):
+    if not _calls:
+        return
+    print(f"\n{'function':<30} {'calls':>12} {'total ms':>10} {'us/call':>8} {'candidates':>12}", file=file)
+    for site, calls in _calls.most_common():
+        seconds = _seconds[site]
+        candidates = _candidates[site] if site in _candidates else ""
+        print(f"{site:<30} {calls:>12} {1000 * seconds:>10.1f} {1e6 * seconds / calls:>8.2f} {candidates:>12}",
+              file=file)
+    print("Times include the instrumentation overhead; compare them with each other, not with plain runs.", file=file)
+    if _output:
+        write_collapsed(_output)
+        print(f"Collapsed stacks written to {_output}", file=file)
+
+if os.environ.get(ENV_VAR) and __name__ != "__main__":
+    enable(os.environ[ENV_VAR])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a script with the move-generation hot spots instrumented.")
+    parser.add_argument("-o", "--output", default="instrument.folded", help="collapsed-stack output file")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    # This file runs as __main__; importing it under its own name enables it
+    # from the environment, so the script and trial_runner share one copy
+    os.environ[ENV_VAR] = args.output
+    importlib.import_module("instrument")
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    runpy.run_path(args.script, run_name="__main__")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Shared bitboard engine for knight move generation.
+
+Squares on an m x n board are numbered row-major (index = r * n + c) and a set
+of squares is a plain Python int with bit i set for square i, so boards of any
+size (32 x 32 and beyond) fit in one integer.
+"""
+
+KNIGHT_MOVES = [
+    (2, 1), (1, 2), (-1, 2), (-2, 1),
+    (-2, -1), (-1, -2), (1, -2), (2, -1)
+]
+
+class KnightBoard:
+    """Precomputed knight attack masks and neighbour lists for an m x n board."""
+
+    def __init__(self, m, n, deltas=KNIGHT_MOVES):
+        self.m = m
+        self.n = n
+        self.size = m * n
+        self.deltas = tuple(deltas)
+        self.full = (1 << self.size) - 1
+        self.coords = [(r, c) for r in range(m) for c in range(n)]
+        self.index = {sq: i for i, sq in enumerate(self.coords)}
+        self.bits = [1 << i for i in range(self.size)]
+        self.bit = {sq: 1 << i for i, sq in enumerate(self.coords)}
+
+        # Neighbour lists keep the order of deltas so that callers which break
+        # ties on "first best move" behave exactly like the old delta loops.
+        self.neighbours = []
+        self.neighbour_coords = {}
+        self.attacks = []
+        for r, c in self.coords:
+            nbrs = tuple(
+                (r + dr) * n + (c + dc)
+                for dr, dc in self.deltas
+                if 0 <= r + dr < m and 0 <= c + dc < n
+            )
+            mask = 0
+            for t in nbrs:
+                mask |= 1 << t
+            self.neighbours.append(nbrs)
+            self.neighbour_coords[(r, c)] = tuple(self.coords[t] for t in nbrs)
+            self.attacks.append(mask)
+
+        # Set-wise attacks: for each delta, the squares that can make that jump
+        # and how far the jump shifts a row-major index.
+        self._shifts = []
+        for dr, dc in self.deltas:
+            src = 0
+            for i, (r, c) in enumerate(self.coords):
+                if 0 <= r + dr < m and 0 <= c + dc < n:
+                    src |= 1 << i
+            self._shifts.append((src, dr * n + dc))
+
+    def legal_moves(self, sq, blocked):
+        """Squares a knight on sq can jump to, skipping any set in blocked."""
+        bits = self.bits
+        return [t for t in self.neighbours[sq] if not blocked & bits[t]]
+
+    def legal_moves_mask(self, sq, blocked):
+        """Bitboard of the squares a knight on sq can jump to."""
+        return self.attacks[sq] & ~blocked
+
+    def mobility(self, sq, blocked):
+        """Number of legal knight moves from sq (mask AND plus popcount)."""
+        return (self.attacks[sq] & ~blocked).bit_count()
+
+    def attacks_of_set(self, squares):
+        """Union of knight attacks from every square set in the squares mask."""
+        result = 0
+        for src, shift in self._shifts:
+            s = squares & src
+            if s:
+                result |= s << shift if shift > 0 else s >> -shift
+        return result
+
+    def mask_of(self, squares):
+        """Bitboard for an iterable of (row, col) squares."""
+        bit = self.bit
+        mask = 0
+        for sq in squares:
+            mask |= bit[sq]
+        return mask
+
+    def squares_of(self, mask):
+        """(row, col) squares set in mask, in index order."""
+        coords = self.coords
+        return [coords[i] for i in iter_bits(mask)]
+
+def iter_bits(mask):
+    """Yield the indices of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+_BOARDS = {}
+
+def get_board(m, n=None, deltas=KNIGHT_MOVES):
+    """Cached KnightBoard for an m x n board (n defaults to m)."""
+    if n is None:
+        n = m
+    key = (m, n, tuple(deltas))
+    board = _BOARDS.get(key)
+    if board is None:
+        board = KnightBoard(m, n, deltas)
+        _BOARDS[key] = board
+    return board
@@ -0,0 +1,128 @@
+"""All-pairs knight distances and shortest-path counts with NumPy.
+
+Instead of one deque BFS per (start, end) query, every source square is
+expanded at once: the BFS frontier is an (S, m, n) array holding, for each
+source s, the number of shortest paths from s to each square at the current
+distance. One step adds the frontier shifted by each knight delta and keeps
+the squares not reached before. Results are (S, S) arrays indexed by square
+id (r * n + c, the same numbering as knight_board).
+
+Those arrays take O(S**2) time and memory: about 2 s and 64 MB on 32x32, and
+nearly a minute on 64x64. single_source_knight_paths runs the same BFS from
+one square with an (m, n) frontier; distance_grid caches its result per
+start square.
+"""
+
+import numpy as np
+
+from knight_board import KNIGHT_MOVES
+
+def _shifted_sum(grid, m, n, deltas):
+    """out[..., r + dr, c + dc] += grid[..., r, c] for every delta, clipped to the board."""
+    out = np.zeros_like(grid)
+    for dr, dc in deltas:
+        r0, r1 = max(0, -dr), min(m, m - dr)
+        c0, c1 = max(0, -dc), min(n, n - dc)
+        if r0 < r1 and c0 < c1:
+            out[..., r0 + dr:r1 + dr, c0 + dc:c1 + dc] += grid[..., r0:r1, c0:c1]
+    return out
+
+def _obstacle_grid(m, n, obstacles):
+    """Boolean (m, n) grid from an (m, n) mask or an iterable of (row, col) squares."""
+    if obstacles is None:
+        return np.zeros((m, n), dtype=bool)
+    if isinstance(obstacles, np.ndarray):
+        return obstacles.astype(bool).reshape(m, n)
+    grid = np.zeros((m, n), dtype=bool)
+    for r, c in obstacles:
+        grid[r, c] = True
+    return grid
+
+# Counts below this can be summed over eight deltas without leaving int64
+_INT64_SAFE = np.iinfo(np.int64).max // 8
+
+def _expand(frontier, dist, count, free, m, n, deltas):
+    """Run the BFS from frontier (path counts of the sources) to completion.
+
+    Path counts grow exponentially with distance, past int64 on boards above
+    about 100x100; once they could overflow the arrays switch to Python ints.
+    """
+    step = 0
+    while frontier.any():
+        step += 1
+        if frontier.dtype != object and frontier.max() > _INT64_SAFE:
+            frontier = frontier.astype(object)
+            count = count.astype(object)
+        reached = _shifted_sum(frontier, m, n, deltas)
+        reached *= free
+        new = (reached > 0) & (dist < 0)
+        dist[new] = step
+        frontier = np.where(new, reached, 0)
+        count += frontier
+    return dist, count
+
+def all_pairs_knight_paths(m, n=None, obstacles=None, deltas=KNIGHT_MOVES):
+    """Distance and shortest-path-count matrices for every pair of squares.
+
+    Returns (dist, count), both of shape (m*n, m*n): dist[s, t] is the number
+    of knight moves from s to t (-1 if unreachable) and count[s, t] the number
+    of distinct shortest paths. Obstacle squares are never entered or left,
+    so their rows and columns are -1 / 0 apart from the diagonal of dist.
+    """
+    if n is None:
+        n = m
+    size = m * n
+    free = ~_obstacle_grid(m, n, obstacles)
+    ids = np.arange(size)
+
+    frontier = np.zeros((size, m, n), dtype=np.int64)
+    frontier[ids, ids // n, ids % n] = free.ravel()
+    dist = np.full((size, m, n), -1, dtype=np.int32)
+    dist[ids, ids // n, ids % n] = 0
+    dist, count = _expand(frontier, dist, frontier.copy(), free, m, n, deltas)
+    return dist.reshape(size, size), count.reshape(size, size)
+
+def single_source_knight_paths(m, n, start, obstacles=None, deltas=KNIGHT_MOVES):
+    """all_pairs_knight_paths for the one source square start.
+
+    Returns (dist, count), both of shape (m, n), indexed by (row, col).
+    """
+    free = ~_obstacle_grid(m, n, obstacles)
+    frontier = np.zeros((m, n), dtype=np.int64)
+    frontier[start] = free[start]
+    dist = np.full((m, n), -1, dtype=np.int32)
+    dist[start] = 0
+    return _expand(frontier, dist, frontier.copy(), free, m, n, deltas)
+
+_CACHE = {}
+
+def knight_paths_matrix(m, n=None, deltas=KNIGHT_MOVES):
+    """Cached all_pairs_knight_paths for an empty board; the arrays are read-only."""
+    if n is None:
+        n = m
+    key = (m, n, tuple(deltas))
+    result = _CACHE.get(key)
+    if result is None:
+        result = all_pairs_knight_paths(m, n, deltas=deltas)
+        for arr in result:
+            arr.setflags(write=False)
+        _CACHE[key] = result
+    return result
+
+def knight_distance_matrix(m, n=None):
+    """Cached (m*n, m*n) knight distance matrix for an empty board."""
+    return knight_paths_matrix(m, n)[0]
+
+_GRIDS = {}
+
+def distance_grid(m, n, start):
+    """dist[r][c] = knight moves from start to (r, c), as a list of lists.
+
+    Each (m, n, start) runs one single-source BFS and is cached after that,
+    so the games' repeated queries cost a list copy.
+    """
+    key = (m, n, tuple(start))
+    dist = _GRIDS.get(key)
+    if dist is None:
+        dist = _GRIDS[key] = single_source_knight_paths(m, n, key[2])[0]
+    return dist.tolist()
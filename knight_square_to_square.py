@@ -1,11 +1,18 @@
 import sys
 from collections import deque
 
+LARGE_BOARD = 64  # boards wider than this use num_knight_paths_large
+
 def algebraic_to_coords(square):
-    """Convert algebraic notation (e.g., 'a1') to board coordinates (row, col)."""
-    col = ord(square[0].lower()) - ord('a')
-    row = int(square[1:]) - 1
-    return row, col
+    """Convert algebraic notation (e.g., 'a1', or 'ab120' past column z) to board coordinates (row, col)."""
+    letters = len(square) - len(square.lstrip("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    if letters == 0:
+        raise ValueError(square)
+    col = 0
+    for ch in square[:letters].lower():
+        col = col * 26 + ord(ch) - ord('a') + 1
+    row = int(square[letters:]) - 1
+    return row, col - 1
 
 def is_valid(r, c, n):
     """Check if the position is valid on an n x n board."""
@@ -41,6 +48,95 @@ def num_knight_paths(n, start, end):
                     paths[nr][nc] += paths[r][c]
     return visited[end[0]][end[1]], paths[end[0]][end[1]]
 
+# --- Large boards ---
+
+def knight_distance(dr, dc):
+    """Knight moves between squares (dr, dc) apart on an unbounded board."""
+    dx, dy = abs(dr), abs(dc)
+    if dx < dy:
+        dx, dy = dy, dx
+    if dx == 1 and dy == 0:
+        return 3
+    if dx == 2 and dy == 2:
+        return 4
+    delta = dx - dy
+    if dy > delta:
+        return delta - 2 * ((delta - dy) // 3)
+    return delta - 2 * ((delta - dy) // 4)
+
+def _window_knight_paths(n, start, end, margin):
+    """BFS path count inside the bounding box of start/end grown by margin."""
+    r0 = max(0, min(start[0], end[0]) - margin)
+    r1 = min(n - 1, max(start[0], end[0]) + margin)
+    c0 = max(0, min(start[1], end[1]) - margin)
+    c1 = min(n - 1, max(start[1], end[1]) + margin)
+    dist = {start: 0}
+    paths = {start: 1}
+    queue = deque([start])
+    while queue:
+        r, c = queue.popleft()
+        if (r, c) == end:
+            break
+        for dr, dc in knight_moves():
+            nr, nc = r + dr, c + dc
+            if r0 <= nr <= r1 and c0 <= nc <= c1:
+                d = dist.get((nr, nc))
+                if d is None:
+                    dist[(nr, nc)] = dist[(r, c)] + 1
+                    paths[(nr, nc)] = paths[(r, c)]
+                    queue.append((nr, nc))
+                elif d == dist[(r, c)] + 1:
+                    paths[(nr, nc)] += paths[(r, c)]
+    whole_board = r0 == 0 and c0 == 0 and r1 == n - 1 and c1 == n - 1
+    return dist.get(end, -1), paths.get(end, 0), whole_board
+
+def num_knight_paths_large(n, start, end):
+    """Same answer as num_knight_paths without walking the whole board.
+
+    Every square v on a shortest path of length L satisfies
+    D(start, v) + D(v, end) == L with D the closed-form unbounded distance,
+    so the path count is a layer-by-layer DP over just those squares, keeping
+    only the current layer. Counts are Python ints, so they never overflow.
+    If no such path stays on the board (corners of small boards), the answer
+    comes from a BFS over a window around the two squares, grown until no
+    square outside it can lie on a path that short.
+    """
+    er, ec = end
+    length = knight_distance(er - start[0], ec - start[1])
+    moves = knight_moves()
+    layer = {start: 1}
+    for step in range(1, length + 1):
+        # A neighbour of layer step-1 is at most step moves from start, so it
+        # is on a shortest path exactly when it is length-step from end.
+        remaining = length - step
+        nxt = {}
+        rejected = set()
+        for (r, c), count in layer.items():
+            for dr, dc in moves:
+                sq = (r + dr, c + dc)
+                if sq in nxt:
+                    nxt[sq] += count
+                elif sq not in rejected:
+                    nr, nc = sq
+                    if 0 <= nr < n and 0 <= nc < n and knight_distance(er - nr, ec - nc) == remaining:
+                        nxt[sq] = count
+                    else:
+                        rejected.add(sq)
+        layer = nxt
+        if not layer:
+            break
+    if layer:
+        return length, layer[end]
+
+    margin = length + 4
+    while True:
+        moves, count, whole_board = _window_knight_paths(n, start, end, margin)
+        # A square more than margin outside the box is over margin / 2 moves
+        # from both ends, so it cannot lie on a path of at most margin moves.
+        if whole_board or (moves != -1 and moves <= margin):
+            return moves, count
+        margin *= 2
+
 def main():
     print("Knight Paths Calculator")
     board_size_input = input("Enter board size (n for n x n board, or just press enter for 8): ").strip()
@@ -59,7 +155,10 @@ def main():
         print("One or both squares are outside the board.")
         sys.exit(1)
 
-    min_moves, num_paths = num_knight_paths(n, start_coords, end_coords)
+    if n > LARGE_BOARD:
+        min_moves, num_paths = num_knight_paths_large(n, start_coords, end_coords)
+    else:
+        min_moves, num_paths = num_knight_paths(n, start_coords, end_coords)
     if min_moves == -1:
         print(f"No path from {start_square} to {end_square} exists.")
     else:
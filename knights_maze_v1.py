@@ -1,6 +1,8 @@
 import random
 import time
-from collections import deque
+
+from knight_distances import distance_grid
+from path_search import MAZE_NODE_BUDGET, find_exact_path
 
 # --- Utility functions from previous script ---
 def algebraic_to_coords(square):
@@ -21,43 +23,11 @@ def knight_moves():
     ]
 
 def min_moves_and_dist_matrix(m, n, start, end):
-    queue = deque()
-    queue.append(start)
-    dist = [[-1 for _ in range(n)] for _ in range(m)]
-    dist[start[0]][start[1]] = 0
-    while queue:
-        r, c = queue.popleft()
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and dist[nr][nc] == -1:
-                dist[nr][nc] = dist[r][c] + 1
-                queue.append((nr, nc))
+    dist = distance_grid(m, n, start)
     return dist[end[0]][end[1]], dist
 
 def find_knight_path_exact_x(m, n, start, end, x):
-    def backtrack(r, c, depth, path, visited):
-        if depth > x:
-            return None
-        if depth == x and (r, c) == end:
-            return path[:]
-        moves = knight_moves()
-        random.shuffle(moves)
-        for dr, dc in moves:
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and not visited[nr][nc]:
-                visited[nr][nc] = True
-                path.append((nr, nc))
-                result = backtrack(nr, nc, depth + 1, path, visited)
-                if result:
-                    return result
-                path.pop()
-                visited[nr][nc] = False
-        return None
-
-    visited = [[False for _ in range(n)] for _ in range(m)]
-    visited[start[0]][start[1]] = True
-    path = [start]
-    return backtrack(start[0], start[1], 0, path, visited)
+    return find_exact_path(m, n, start, end, x, rng=random, node_budget=MAZE_NODE_BUDGET)
 
 # --- Maze Game Setup ---
 def random_square(m, n):
@@ -72,7 +42,16 @@ def squares_one_move_away(m, n, square):
             result.add((nr, nc))
     return result
 
-def generate_game_board(m=8, n=8, obstacle_mode="normal", timer_mode="stopwatch"):
+def _add_timings(timings, **stages):
+    for stage, value in stages.items():
+        timings[stage] = timings.get(stage, 0) + value
+
+def generate_game_board(m=8, n=8, obstacle_mode="normal", timer_mode="stopwatch", verbose=True, timings=None):
+    # verbose=False generates silently (batch use). A timings dict gets the
+    # seconds spent in each stage added to it, plus the path search attempts.
+    log = print if verbose else (lambda *args: None)
+    t0 = time.perf_counter()
+
     # 1. Generate start and target squares
     while True:
         start = random_square(m, n)
@@ -82,7 +61,9 @@ def generate_game_board(m=8, n=8, obstacle_mode="normal", timer_mode="stopwatch"
             if y >= 2:
                 break
 
-    print(f"Start: {coords_to_algebraic(*start)}, Target: {coords_to_algebraic(*target)}, Minimum moves (y): {y}")
+    log(f"Start: {coords_to_algebraic(*start)}, Target: {coords_to_algebraic(*target)}, Minimum moves (y): {y}")
+
+    t1 = time.perf_counter()
 
     # 2. Calculate allowed maze path length
     min_x = m // 2 + y
@@ -105,32 +86,22 @@ def generate_game_board(m=8, n=8, obstacle_mode="normal", timer_mode="stopwatch"
             else:
                 break
         if tries > 1000:  # avoid infinite loop
+            if timings is not None:
+                _add_timings(timings, endpoints=t1 - t0, path=time.perf_counter() - t1, path_tries=tries)
             raise Exception("Could not generate a maze path with constraints.")
 
-    print(f"Maze path length (x): {x}")
-    print(f"Maze path: {[coords_to_algebraic(*sq) for sq in maze_path]}")
+    t2 = time.perf_counter()
+    log(f"Maze path length (x): {x}")
+    log(f"Maze path: {[coords_to_algebraic(*sq) for sq in maze_path]}")
 
     # 4. Find shortest path squares
     # Use BFS/backtracking to enumerate shortest path squares
     # For simplicity, use BFS layers to approximate all shortest path squares
     # (For full enumeration, see previous scripts)
-    shortest_path_layer = set()
-    queue = deque()
-    queue.append((start[0], start[1], 0))
-    shortest_path_layer.add(start)
-    visited = [[False for _ in range(n)] for _ in range(m)]
-    visited[start[0]][start[1]] = True
-    while queue:
-        r, c, d = queue.popleft()
-        if d > y:
-            continue
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and dist_matrix[nr][nc] == dist_matrix[r][c] + 1:
-                shortest_path_layer.add((nr, nc))
-                if not visited[nr][nc]:
-                    visited[nr][nc] = True
-                    queue.append((nr, nc, d + 1))
+    shortest_path_layer = {
+        (r, c) for r in range(m) for c in range(n)
+        if 0 <= dist_matrix[r][c] <= y + 1
+    }
 
     # 5. Obstacles on shortest path not in maze path
     maze_path_set = set(maze_path)
@@ -142,13 +113,15 @@ def generate_game_board(m=8, n=8, obstacle_mode="normal", timer_mode="stopwatch"
     # 6. Optionally add random obstacles
     remaining_squares = {(r, c) for r in range(m) for c in range(n)} - maze_path_set - obstacles
     extra_obstacles = set()
-    if obstacle_mode == "extra":
+    if obstacle_mode == "extra" and remaining_squares:
         num_extra = random.randint(int(0.1 * len(remaining_squares)), max(1, int(0.5 * len(remaining_squares))))
         extra_obstacles = set(random.sample(list(remaining_squares), num_extra))
-        print(f"Extra obstacles placed: {num_extra}")
+        log(f"Extra obstacles placed: {num_extra}")
 
     total_obstacles = obstacles | extra_obstacles
-    print(f"Obstacles: {[coords_to_algebraic(*sq) for sq in total_obstacles]}")
+    log(f"Obstacles: {[coords_to_algebraic(*sq) for sq in total_obstacles]}")
+    if timings is not None:
+        _add_timings(timings, endpoints=t1 - t0, path=t2 - t1, obstacles=time.perf_counter() - t2, path_tries=tries)
 
     # 7. Output all game settings
     return {
@@ -0,0 +1,155 @@
+"""Batch Knight's Maze generation for content pipelines.
+
+Generates --count mazes with knights_maze_v1.generate_game_board for every
+combination of board size, obstacle mode and timer mode, in parallel, and
+writes them as JSON Lines (one maze per line) or as a maze_library binary
+file. The run ends with a report per combination: mazes/second of worker
+time, failure rate (mostly "Could not generate a maze path" after 1000
+attempts; every failure message is counted), mean path search attempts and the mean time in each generation stage, which
+shows the parameter combinations that are too expensive to generate.
+
+    python maze_batch.py mazes.jsonl --sizes 6 8 12 16 --count 100
+    python maze_batch.py mazes.kml --format binary --sizes 8 --obstacle-modes extra
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from knight_distances import distance_grid
+from knights_maze_v1 import generate_game_board
+from maze_library import write_library
+from trial_runner import derive_seed
+
+OBSTACLE_MODES = ("normal", "extra")
+# knights_maze_v1 boards have no entry square, so they are the library's
+# plain records; its "normal"/"extra" records are v3 entry-square mazes
+LIBRARY_MODES = {"normal": "plain", "extra": "plain_extra"}
+TIMER_MODES = ("stopwatch", "countdown")
+STAGES = ("endpoints", "path", "obstacles")
+
+def _generate_chunk(args):
+    size, obstacle_mode, timer_mode, count, seed = args
+    random.seed(seed)
+    mazes = []
+    failures = Counter()
+    timings = {}
+    t0 = time.perf_counter()
+    for _ in range(count):
+        try:
+            maze = generate_game_board(size, size, obstacle_mode, timer_mode, verbose=False, timings=timings)
+        except Exception as e:
+            failures[f"{type(e).__name__}: {e}"] += 1
+            continue
+        start, target = maze["start"], maze["target"]
+        maze["x"] = len(maze["maze_path"]) - 1
+        maze["y"] = distance_grid(size, size, start)[target[0]][target[1]]
+        maze["mode"] = obstacle_mode
+        maze["timer_mode"] = timer_mode
+        mazes.append(maze)
+    return (size, obstacle_mode, timer_mode), mazes, failures, timings, time.perf_counter() - t0
+
+def maze_to_json(maze):
+    return json.dumps({
+        "board_size": list(maze["board_size"]),
+        "start": list(maze["start"]),
+        "target": list(maze["target"]),
+        "maze_path": [list(sq) for sq in maze["maze_path"]],
+        "obstacles": sorted(list(sq) for sq in maze["obstacles"]),
+        "x": maze["x"],
+        "y": maze["y"],
+        "obstacle_mode": maze["mode"],
+        "timer_mode": maze["timer_mode"],
+    })
+
+def generate_batch(sizes, count, obstacle_modes=OBSTACLE_MODES, timer_modes=TIMER_MODES,
+                   workers=None, seed=0, chunk=10, on_mazes=None):
+    """Generate count mazes per combination; returns {combo: stats}.
+
+    on_mazes(mazes) is called with each finished chunk of mazes. Stats hold
+    the maze count, a Counter of failure messages, worker seconds, path
+    search attempts and seconds per stage for the combination.
+    """
+    jobs = []
+    for size in sizes:
+        for obstacle_mode in obstacle_modes:
+            for timer_mode in timer_modes:
+                for start in range(0, count, chunk):
+                    jobs.append((size, obstacle_mode, timer_mode, min(chunk, count - start),
+                                 derive_seed(seed, size, obstacle_mode, timer_mode, start)))
+    stats = {}
+    done = 0
+    t0 = time.time()
+    with Pool(workers) as pool:
+        for combo, mazes, failures, timings, seconds in pool.imap_unordered(_generate_chunk, jobs):
+            entry = stats.setdefault(combo, {"mazes": 0, "failures": Counter(), "seconds": 0.0, "timings": {}})
+            entry["mazes"] += len(mazes)
+            entry["failures"].update(failures)
+            entry["seconds"] += seconds
+            for stage, value in timings.items():
+                entry["timings"][stage] = entry["timings"].get(stage, 0) + value
+            if on_mazes is not None:
+                on_mazes(mazes)
+            done += len(mazes) + sum(failures.values())
+            print(f"\r{done} mazes, {time.time() - t0:.1f}s", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return stats
+
+def print_report(stats, wall_seconds):
+    print(f"{'size':>4} {'obstacles':<9} {'timer':<9} {'ok':>6} {'fail%':>6} {'mazes/s':>8} {'tries':>6}"
+          + "".join(f" {stage + ' ms':>12}" for stage in STAGES))
+    total = 0
+    reasons = Counter()
+    for (size, obstacle_mode, timer_mode), entry in sorted(stats.items()):
+        failures = sum(entry["failures"].values())
+        attempts = entry["mazes"] + failures
+        total += entry["mazes"]
+        reasons.update(entry["failures"])
+        timings = entry["timings"]
+        rate = entry["mazes"] / entry["seconds"] if entry["seconds"] else 0.0
+        print(f"{size:>4} {obstacle_mode:<9} {timer_mode:<9} {entry['mazes']:>6} "
+              f"{100 * failures / attempts:>6.1f} {rate:>8.1f} "
+              f"{timings.get('path_tries', 0) / attempts:>6.1f}"
+              + "".join(f" {1000 * timings.get(stage, 0) / attempts:>12.2f}" for stage in STAGES))
+    for reason, count in reasons.most_common():
+        print(f"failed {count}x: {reason}")
+    print(f"{total} mazes in {wall_seconds:.1f}s ({total / wall_seconds:.1f} mazes/s overall)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Knight's Maze boards in bulk.")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=("jsonl", "binary"), default="jsonl")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8])
+    parser.add_argument("--obstacle-modes", nargs="+", choices=OBSTACLE_MODES, default=list(OBSTACLE_MODES))
+    parser.add_argument("--timer-modes", nargs="+", choices=TIMER_MODES, default=list(TIMER_MODES))
+    parser.add_argument("--count", type=int, default=100, help="mazes per combination")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if any(not 6 <= size <= 32 for size in args.sizes):
+        parser.error("board sizes must be between 6 and 32")
+
+    t0 = time.time()
+    if args.format == "jsonl":
+        with open(args.output, "w") as f:
+            stats = generate_batch(args.sizes, args.count, args.obstacle_modes, args.timer_modes, args.workers,
+                                   args.seed, on_mazes=lambda mazes: f.writelines(maze_to_json(m) + "\n" for m in mazes))
+    else:
+        # The binary library stores the maze itself; the timer mode is a game
+        # setting and is not part of a record
+        collected = []
+        def collect(mazes):
+            for maze in mazes:
+                maze["mode"] = LIBRARY_MODES[maze["mode"]]
+            collected.extend(mazes)
+        stats = generate_batch(args.sizes, args.count, args.obstacle_modes, args.timer_modes, args.workers,
+                               args.seed, on_mazes=collect)
+        write_library(args.output, collected)
+    print_report(stats, time.time() - t0)
+
+if __name__ == "__main__":
+    sys.exit(main())
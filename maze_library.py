@@ -0,0 +1,290 @@
+"""Precomputed maze library: a compact binary file with an index.
+
+File layout (little-endian):
+
+    header   magic b"KMAZ", version u16, record count u32, index offset u64
+    records  RECORD fields, then path_len u16 square ids, then the obstacle
+             bitmask in (m*n + 7) // 8 bytes
+    index    key count u32, then per key: KEY fields (m, n, x, y, mode,
+             difficulty, record count) followed by that many u64 offsets
+
+Squares are stored as row-major ids (r * n + c) and obstacles as a bitmask,
+the same encoding as knight_board. The loader memory-maps the file and only
+parses the index, so picking a maze is one random offset and one record
+decode however big the library is.
+
+Build one with all cores:
+
+    python maze_library.py build mazes.kml --sizes 8 10 12 --count 500
+    python maze_library.py build hard.kml --sizes 8 --difficulty 6 9
+    python maze_library.py info mazes.kml
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from multiprocessing import Pool
+
+from knight_distances import distance_grid
+from maze_difficulty import generate_in_band
+from trial_runner import derive_seed
+
+MAGIC = b"KMAZ"
+VERSION = 1
+HEADER = struct.Struct("<4sHIQ")
+RECORD = struct.Struct("<BBHHHHHBBH")  # m, n, start, target, entry, x, y, mode, difficulty, path_len
+KEY = struct.Struct("<BBHHBBI")        # m, n, x, y, mode, difficulty, count
+NO_SQUARE = 0xFFFF
+
+# Obstacle modes: maze_pygame_modes_v3 mazes without / with extra obstacles,
+# maze_pygame_modes_v5 induced paths (every other square is an obstacle), and
+# maze_pygame_modes_v1/v2 mazes without / with extra obstacles. v1/v2 mazes
+# have no entry square, so every square one move from the target stays open
+# unless the path layers cover it. New modes go at the end: records store
+# the position.
+MODES = ("normal", "extra", "induced", "plain", "plain_extra")
+
+DEFAULT_LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mazes.kml")
+
+# --- Encoding ---
+
+def encode_maze(maze):
+    m, n = maze["board_size"]
+    sq = lambda rc: rc[0] * n + rc[1]
+    entry = maze.get("entry_square")
+    path = maze["maze_path"]
+    mask = 0
+    for r, c in maze["obstacles"]:
+        mask |= 1 << (r * n + c)
+    return b"".join((
+        RECORD.pack(m, n, sq(maze["start"]), sq(maze["target"]),
+                    NO_SQUARE if entry is None else sq(entry),
+                    maze["x"], maze["y"], MODES.index(maze["mode"]), maze.get("difficulty", 0), len(path)),
+        struct.pack(f"<{len(path)}H", *(sq(p) for p in path)),
+        mask.to_bytes((m * n + 7) // 8, "little"),
+    ))
+
+def decode_maze(buf, offset):
+    m, n, start, target, entry, x, y, mode, difficulty, path_len = RECORD.unpack_from(buf, offset)
+    offset += RECORD.size
+    rc = lambda sq: (sq // n, sq % n)
+    path = [rc(sq) for sq in struct.unpack_from(f"<{path_len}H", buf, offset)]
+    offset += 2 * path_len
+    size = (m * n + 7) // 8
+    mask = int.from_bytes(buf[offset:offset + size], "little")
+    obstacles = set()
+    while mask:
+        low = mask & -mask
+        obstacles.add(rc(low.bit_length() - 1))
+        mask ^= low
+    return {
+        "board_size": (m, n),
+        "start": rc(start),
+        "target": rc(target),
+        "entry_square": None if entry == NO_SQUARE else rc(entry),
+        "maze_path": path,
+        "obstacles": obstacles,
+        "x": x,
+        "y": y,
+        "mode": MODES[mode],
+        "difficulty": difficulty,
+    }
+
+def maze_key(maze):
+    m, n = maze["board_size"]
+    return m, n, maze["x"], maze["y"], MODES.index(maze["mode"]), maze.get("difficulty", 0)
+
+def write_library(path, mazes):
+    """Write mazes (dicts as returned by decode_maze) to a library file."""
+    groups = {}
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        count = 0
+        for maze in mazes:
+            groups.setdefault(maze_key(maze), []).append(f.tell())
+            f.write(encode_maze(maze))
+            count += 1
+        index_offset = f.tell()
+        f.write(struct.pack("<I", len(groups)))
+        for key in sorted(groups):
+            offsets = groups[key]
+            f.write(KEY.pack(*key, len(offsets)))
+            f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, count, index_offset))
+
+# --- Loading ---
+
+def _matches(query, key):
+    for want, have in zip(query, key):
+        if want is None:
+            continue
+        if isinstance(want, tuple):
+            if not want[0] <= have <= want[1]:
+                return False
+        elif want != have:
+            return False
+    return True
+
+class MazeLibrary:
+    """Memory-mapped maze library; only the index is parsed up front."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, index_offset = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} maze library")
+        # key -> (position of its offset table, number of records)
+        self.index = {}
+        pos = index_offset
+        (num_keys,) = struct.unpack_from("<I", self._buf, pos)
+        pos += 4
+        for _ in range(num_keys):
+            *key, count = KEY.unpack_from(self._buf, pos)
+            pos += KEY.size
+            self.index[tuple(key)] = (pos, count)
+            pos += 8 * count
+        self._matches = {}
+
+    def record(self, key, i):
+        table, count = self.index[key]
+        (offset,) = struct.unpack_from("<Q", self._buf, table + 8 * (i % count))
+        return decode_maze(self._buf, offset)
+
+    def pick(self, m, n, mode, x=None, y=None, difficulty=None, rng=random):
+        """Random maze with these parameters, or None.
+
+        None matches anything; difficulty may also be a (lo, hi) band.
+        """
+        if isinstance(difficulty, list):
+            difficulty = tuple(difficulty)
+        query = (m, n, x, y, MODES.index(mode), difficulty)
+        keys = self._matches.get(query)
+        if keys is None:
+            keys = [key for key in self.index if _matches(query, key)]
+            self._matches[query] = keys
+        if not keys:
+            return None
+        total = sum(self.index[key][1] for key in keys)
+        i = rng.randrange(total)
+        for key in keys:
+            count = self.index[key][1]
+            if i < count:
+                return self.record(key, i)
+            i -= count
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+def load_library(path=DEFAULT_LIBRARY):
+    """MazeLibrary for path, or None if there is no library file."""
+    if not os.path.exists(path):
+        return None
+    return MazeLibrary(path)
+
+def maze_for_settings(library, settings, rng=random, entry_square=True):
+    """Game maze for maze_pygame_modes settings drawn from library, or None.
+
+    entry_square=False draws the v1/v2 mazes, which have none.
+    """
+    mode = "extra" if settings.get("extra_obstacles", False) else "normal"
+    if not entry_square:
+        mode = "plain_extra" if mode == "extra" else "plain"
+    maze = library.pick(settings.get("board_w", 8), settings.get("board_h", 8), mode,
+                        difficulty=settings.get("difficulty"), rng=rng)
+    if maze is None:
+        return None
+    maze["obstacles_visible"] = settings.get("obstacles_visible", True)
+    maze["return_to_start"] = settings.get("return_to_start", False)
+    maze["timer_type"] = settings.get("timer_type", "stopwatch")
+    maze["timer_length"] = settings.get("timer_length", 5*60)
+    return maze
+
+# --- Bulk generation ---
+
+def _induced_maze(settings):
+    from maze_pygame_modes_v5 import generate_maze_path, maze_params
+    size = settings["board_w"]
+    start, target, path = generate_maze_path(maze_params(size))
+    return {
+        "board_size": (size, size),
+        "start": start,
+        "target": target,
+        "entry_square": None,
+        "maze_path": path,
+        "obstacles": {(r, c) for r in range(size) for c in range(size)} - set(path),
+    }
+
+def _generate_chunk(args):
+    mode, size, count, seed, band = args
+    random.seed(seed)
+    # Game modules import pygame, so only load them in the workers
+    if mode == "induced":
+        generate = _induced_maze
+    elif mode in ("plain", "plain_extra"):
+        from maze_pygame_modes_v1 import generate_maze as generate
+    else:
+        from maze_pygame_modes_v3 import generate_maze as generate
+    settings = {"board_w": size, "board_h": size, "extra_obstacles": mode in ("extra", "plain_extra")}
+    rng = random.Random(seed)
+    mazes = [generate_in_band(generate, settings, band, rng=rng) for _ in range(count)]
+    for maze in mazes:
+        del maze["difficulty_metrics"]
+        start, target = maze["start"], maze["target"]
+        maze["x"] = len(maze["maze_path"]) - 1
+        maze["y"] = distance_grid(size, size, start)[target[0]][target[1]]
+        maze["mode"] = mode
+    return mazes
+
+def build_library(path, sizes, count, modes=MODES, workers=None, seed=0, band=(0, 9), chunk=25):
+    jobs = []
+    for mode in modes:
+        for size in sizes:
+            for start in range(0, count, chunk):
+                jobs.append((mode, size, min(chunk, count - start), derive_seed(seed, mode, size, start), band))
+    mazes = []
+    t0 = time.time()
+    with Pool(workers) as pool:
+        for batch in pool.imap_unordered(_generate_chunk, jobs):
+            mazes.extend(batch)
+            print(f"\r{len(mazes)} mazes, {time.time() - t0:.1f}s", end="", flush=True)
+    print()
+    write_library(path, mazes)
+    return len(mazes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a maze library file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("path", nargs="?", default=DEFAULT_LIBRARY)
+    build.add_argument("--sizes", type=int, nargs="+", default=[8])
+    build.add_argument("--count", type=int, default=200, help="mazes per size and mode")
+    build.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    build.add_argument("--workers", type=int, default=None)
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--difficulty", type=int, nargs=2, default=[0, 9], metavar=("LO", "HI"),
+                       help="only keep mazes rated LO..HI by maze_difficulty")
+    info = sub.add_parser("info")
+    info.add_argument("path", nargs="?", default=DEFAULT_LIBRARY)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        total = build_library(args.path, args.sizes, args.count, args.modes, args.workers, args.seed,
+                              tuple(args.difficulty))
+        print(f"Wrote {total} mazes to {args.path} ({os.path.getsize(args.path)} bytes)")
+    else:
+        library = MazeLibrary(args.path)
+        print(f"{library.count} mazes, {len(library.index)} keys")
+        print(f"{'m':>3} {'n':>3} {'x':>4} {'y':>3} {'mode':<11} {'diff':>4} {'count':>6}")
+        for (m, n, x, y, mode, diff), (_, count) in sorted(library.index.items()):
+            print(f"{m:>3} {n:>3} {x:>4} {y:>3} {MODES[mode]:<11} {diff:>4} {count:>6}")
+        library.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import sys
-from collections import deque
+
+from path_search import find_exact_path
+from shortest_paths import ShortestPathDAG
 
 def algebraic_to_coords(square):
     col = ord(square[0].lower()) - ord('a')
@@ -12,83 +14,8 @@ def coords_to_algebraic(row, col):
 def is_valid(r, c, n):
     return 0 <= r < n and 0 <= c < n
 
-def knight_moves():
-    return [
-        (2, 1), (1, 2), (-1, 2), (-2, 1),
-        (-2, -1), (-1, -2), (1, -2), (2, -1)
-    ]
-
-def num_knight_paths(n, start, end):
-    queue = deque()
-    queue.append((start[0], start[1]))
-    visited = [[-1 for _ in range(n)] for _ in range(n)]
-    paths = [[0 for _ in range(n)] for _ in range(n)]
-
-    visited[start[0]][start[1]] = 0
-    paths[start[0]][start[1]] = 1
-
-    while queue:
-        r, c = queue.popleft()
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, n):
-                if visited[nr][nc] == -1:
-                    visited[nr][nc] = visited[r][c] + 1
-                    paths[nr][nc] = paths[r][c]
-                    queue.append((nr, nc))
-                elif visited[nr][nc] == visited[r][c] + 1:
-                    paths[nr][nc] += paths[r][c]
-    return visited[end[0]][end[1]], paths[end[0]][end[1]], visited
-
 def find_knight_path_exact_x(n, start, end, x):
-    def backtrack(r, c, depth, path, visited):
-        if depth > x:
-            return None
-        if depth == x and (r, c) == end:
-            return path[:]
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, n) and not visited[nr][nc]:
-                visited[nr][nc] = True
-                path.append((nr, nc))
-                result = backtrack(nr, nc, depth + 1, path, visited)
-                if result:
-                    return result
-                path.pop()
-                visited[nr][nc] = False
-        return None
-
-    visited = [[False for _ in range(n)] for _ in range(n)]
-    visited[start[0]][start[1]] = True
-    path = [start]
-    return backtrack(start[0], start[1], 0, path, visited)
-
-def squares_on_any_shortest_path(n, start, end, min_moves, visited_matrix):
-    """
-    Returns the set of all squares that appear on any shortest path from start to end.
-    Uses BFS levels.
-    """
-    squares = set()
-    if min_moves == -1:
-        return squares
-    queue = deque()
-    queue.append((start[0], start[1], 0))
-    squares.add(start)
-    visited = [[False for _ in range(n)] for _ in range(n)]
-    visited[start[0]][start[1]] = True
-
-    while queue:
-        r, c, d = queue.popleft()
-        if d > min_moves:
-            continue
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, n) and visited_matrix[nr][nc] == d + 1:
-                squares.add((nr, nc))
-                if not visited[nr][nc]:
-                    visited[nr][nc] = True
-                    queue.append((nr, nc, d + 1))
-    return squares
+    return find_exact_path(n, n, start, end, x)
 
 def main():
     print("Knight Paths Calculator (simple path, exact-move search)")
@@ -110,7 +37,8 @@ def main():
         print("One or both squares are outside the board.")
         sys.exit(1)
 
-    min_moves, num_paths, visited_matrix = num_knight_paths(n, start_coords, end_coords)
+    dag = ShortestPathDAG(n, n, start_coords, end_coords)
+    min_moves, num_paths = dag.length, dag.num_paths
     if min_moves == -1:
         print(f"No path from {start_square} to {end_square} exists.")
     else:
@@ -128,7 +56,7 @@ def main():
         print(f"No simple path of exactly {x} moves from {start_square} to {end_square} was found.")
 
     # All squares on any shortest path
-    squares_shortest = squares_on_any_shortest_path(n, start_coords, end_coords, min_moves, visited_matrix)
+    squares_shortest = dag.squares
     path_set = set(path) if path else set()
     squares_intersection = squares_shortest & path_set
 
@@ -1,5 +1,7 @@
 import sys
 
+from path_search import find_exact_path
+
 def algebraic_to_coords(square):
     col = ord(square[0].lower()) - ord('a')
     row = int(square[1:]) - 1
@@ -41,28 +43,7 @@ def num_knight_paths(n, start, end):
     return visited[end[0]][end[1]], paths[end[0]][end[1]]
 
 def find_knight_path_exact_x(n, start, end, x):
-    # Backtracking search for a simple path of length x
-    def backtrack(r, c, depth, path, visited):
-        if depth > x:
-            return None
-        if depth == x and (r, c) == end:
-            return path[:]
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, n) and not visited[nr][nc]:
-                visited[nr][nc] = True
-                path.append((nr, nc))
-                result = backtrack(nr, nc, depth + 1, path, visited)
-                if result:
-                    return result
-                path.pop()
-                visited[nr][nc] = False
-        return None
-
-    visited = [[False for _ in range(n)] for _ in range(n)]
-    visited[start[0]][start[1]] = True
-    path = [start]
-    return backtrack(start[0], start[1], 0, path, visited)
+    return find_exact_path(n, n, start, end, x)
 
 def main():
     print("Knight Paths Calculator (simple path, exact-move search)")
@@ -0,0 +1,88 @@
+"""Background maze generation for the pygame games.
+
+A MazePool keeps a few ready mazes per settings combination. Each settings
+key gets its own bounded queue fed by worker processes, so starting or
+replaying a game only pops from a queue. Workers block once their queue is
+full and refill it while the player is playing. get() raises RuntimeError
+if every worker of its key has exited, e.g. because generate raised, so a
+broken generator does not leave the game waiting forever.
+"""
+
+import multiprocessing
+import queue
+import random
+import time
+
+POLL = 0.25  # seconds between worker liveness checks while waiting
+
+def settings_key(settings):
+    """Hashable key for a settings dict (or any hashable settings value)."""
+    if isinstance(settings, dict):
+        return tuple(sorted(settings.items()))
+    return settings
+
+def _worker(generate, settings, out):
+    # Forked workers start with the parent's random state; reseed so they
+    # do not all produce the same mazes.
+    random.seed()
+    while True:
+        out.put(generate(settings))
+
+class MazePool:
+    """Pre-generates generate(settings) results in worker processes.
+
+    generate must be a module-level function so it can be sent to the
+    workers. size is how many ready mazes each queue holds.
+    """
+
+    def __init__(self, generate, size=3, workers_per_key=1):
+        self.generate = generate
+        self.size = size
+        self.workers_per_key = workers_per_key
+        self._queues = {}
+        self._workers = {}
+        self._processes = []
+
+    def request(self, settings):
+        """Start generating for settings in the background if not already running."""
+        key = settings_key(settings)
+        out = self._queues.get(key)
+        if out is None:
+            out = multiprocessing.Queue(self.size)
+            self._queues[key] = out
+            workers = self._workers[key] = []
+            for _ in range(self.workers_per_key):
+                proc = multiprocessing.Process(target=_worker, args=(self.generate, settings, out), daemon=True)
+                proc.start()
+                workers.append(proc)
+                self._processes.append(proc)
+        return out
+
+    def get(self, settings, timeout=None):
+        """Pop a ready maze for settings, or None if none arrives within timeout.
+
+        timeout=None waits as long as a worker for settings is alive.
+        """
+        out = self.request(settings)
+        workers = self._workers[settings_key(settings)]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = POLL if deadline is None else min(POLL, deadline - time.monotonic())
+            try:
+                return out.get(timeout=max(0, wait))
+            except queue.Empty:
+                pass
+            if not any(proc.is_alive() for proc in workers):
+                codes = ", ".join(str(proc.exitcode) for proc in workers)
+                raise RuntimeError(f"maze workers exited (exit code {codes}) for settings {settings!r}")
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+    def close(self):
+        for proc in self._processes:
+            proc.terminate()
+        for proc in self._processes:
+            proc.join()
+        self._processes = []
+        self._queues = {}
+        self._workers = {}
@@ -1,13 +1,39 @@
 import pygame
 import random
 import time
-from collections import deque
+
+from knight_distances import distance_grid
+from maze_difficulty import generate_in_band
+from maze_library import load_library, maze_for_settings
+from maze_pool import MazePool
+from path_search import MAZE_NODE_BUDGET, find_exact_path
 
 SQUARE_SIZE = 64
 MARGIN = 40
 FPS = 30
 PURPLE = (160, 32, 240)
 
+MODE_SETTINGS = {
+    "easy": {
+        "board_w": 8,
+        "board_h": 8,
+        "extra_obstacles": False,
+        "obstacles_visible": True,
+        "return_to_start": False,
+        "timer_type": "stopwatch",
+        "timer_length": 5*60
+    },
+    "hard": {
+        "board_w": 8,
+        "board_h": 8,
+        "extra_obstacles": True,
+        "obstacles_visible": False,
+        "return_to_start": True,
+        "timer_type": "countdown",
+        "timer_length": 5*60
+    },
+}
+
 def knight_moves():
     return [
         (2, 1), (1, 2), (-1, 2), (-2, 1),
@@ -18,17 +44,7 @@ def is_valid(r, c, m, n):
     return 0 <= r < m and 0 <= c < n
 
 def min_moves_and_dist_matrix(m, n, start, end):
-    queue = deque()
-    queue.append(start)
-    dist = [[-1 for _ in range(n)] for _ in range(m)]
-    dist[start[0]][start[1]] = 0
-    while queue:
-        r, c = queue.popleft()
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and dist[nr][nc] == -1:
-                dist[nr][nc] = dist[r][c] + 1
-                queue.append((nr, nc))
+    dist = distance_grid(m, n, start)
     return dist[end[0]][end[1]], dist
 
 def squares_one_move_away(m, n, square):
@@ -43,10 +59,8 @@ def squares_one_move_away(m, n, square):
 def find_knight_path_exact_x(m, n, start, end, x, y, entry_square):
     tries = 0
     while True:
-        visited = [[False for _ in range(n)] for _ in range(m)]
-        visited[start[0]][start[1]] = True
-        path = [start]
-        res = _backtrack_knight_path_entry(m, n, start[0], start[1], end, x, 0, path, visited, entry_square)
+        res = find_exact_path(m, n, start, end, x, rng=random, node_budget=MAZE_NODE_BUDGET,
+                              entry_square=entry_square)
         if res:
             if y == 2:
                 forbidden = squares_one_move_away(m, n, end)
@@ -60,31 +74,6 @@ def find_knight_path_exact_x(m, n, start, end, x, y, entry_square):
         if tries > 1000:
             return None
 
-def _backtrack_knight_path_entry(m, n, r, c, end, x, depth, path, visited, entry_square):
-    if depth > x:
-        return None
-    if depth == x and (r, c) == end:
-        # Ensure the previous square is the entry square
-        if len(path) < 2 or path[-2] != entry_square:
-            return None
-        return path[:]
-    moves = knight_moves()
-    random.shuffle(moves)
-    for dr, dc in moves:
-        nr, nc = r + dr, c + dc
-        if is_valid(nr, nc, m, n) and not visited[nr][nc]:
-            # If moving to target, must come from entry_square
-            if (nr, nc) == end and (r, c) != entry_square:
-                continue
-            visited[nr][nc] = True
-            path.append((nr, nc))
-            result = _backtrack_knight_path_entry(m, n, nr, nc, end, x, depth + 1, path, visited, entry_square)
-            if result:
-                return result
-            path.pop()
-            visited[nr][nc] = False
-    return None
-
 def random_square(m, n):
     return (random.randint(0, m-1), random.randint(0, n-1))
 
@@ -107,7 +96,7 @@ def generate_maze(settings):
         # Find entry squares at least 2 moves from start
         candidates = []
         for entry in squares_one_move_away(m, n, target):
-            entry_dist, _ = min_moves_and_dist_matrix(m, n, start, entry)
+            entry_dist = dist_matrix[entry[0]][entry[1]]
             if entry != start and entry_dist >= 2:
                 candidates.append(entry)
         if not candidates:
@@ -134,23 +123,11 @@ def generate_maze(settings):
     obstacles = set(entry_sqs)
     # Continue with regular obstacles on shortest path that are not on maze path or entry square
     y, dist_matrix = min_moves_and_dist_matrix(m, n, start, target)
-    shortest_path_layer = set()
-    queue = deque()
-    queue.append((start[0], start[1], 0))
-    shortest_path_layer.add(start)
-    visited = [[False for _ in range(n)] for _ in range(m)]
-    visited[start[0]][start[1]] = True
-    while queue:
-        r, c, d = queue.popleft()
-        if d > y:
-            continue
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and dist_matrix[nr][nc] == dist_matrix[r][c] + 1:
-                shortest_path_layer.add((nr, nc))
-                if not visited[nr][nc]:
-                    visited[nr][nc] = True
-                    queue.append((nr, nc, d + 1))
+    # BFS layers out to one move past the target: squares within y + 1 moves of start
+    shortest_path_layer = {
+        (r, c) for r in range(m) for c in range(n)
+        if 0 <= dist_matrix[r][c] <= y + 1
+    }
     for sq in shortest_path_layer:
         if sq not in maze_path_set and sq != entry_square and sq != target:
             obstacles.add(sq)
@@ -179,6 +156,14 @@ def generate_maze(settings):
         "entry_square": entry_square
     }
 
+def generate_rated_maze(settings):
+    # generate_maze, repeated until the maze rates inside settings["difficulty"]
+    # (a (lo, hi) band on maze_difficulty's 0-9 scale); the rating is kept.
+    # Without a band any maze will do, so it is not rated
+    if settings.get("difficulty") is None:
+        return generate_maze(settings)
+    return generate_in_band(generate_maze, settings, settings["difficulty"])
+
 def draw_text_menu(screen, font, options, selected, title=""):
     screen.fill((50, 50, 50))
     if title:
@@ -358,33 +343,44 @@ def draw_board(screen, board_w, board_h, knight_pos, target, obstacles, revealed
     for c in range(board_w+1):
         pygame.draw.line(screen, (0,0,0), (MARGIN + c*SQUARE_SIZE, MARGIN), (MARGIN + c*SQUARE_SIZE, MARGIN + board_h*SQUARE_SIZE), 2)
 
+def wait_for_maze(pool, settings):
+    # Custom settings only start generating here, so keep a window up that
+    # says so and can be closed; pool.get raises if the workers died
+    maze = pool.get(settings, timeout=0.1)
+    if maze is not None:
+        return maze
+    screen = pygame.display.set_mode((640, 360))
+    font = pygame.font.SysFont(None, 36)
+    while maze is None:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pool.close()
+                pygame.quit()
+                exit()
+        draw_text_menu(screen, font, [], 0, "Generating maze...")
+        maze = pool.get(settings, timeout=0.1)
+    return maze
+
 def main():
+    # Draw from the prebuilt maze library when there is one; otherwise the
+    # preset mazes are generated in the background while the menu is open
+    library = load_library()
+    pool = MazePool(generate_rated_maze)
+    if library is None:
+        for preset in MODE_SETTINGS.values():
+            pool.request(preset)
     mode = pygame_mode_selection()
-    if mode == "easy":
-        settings = {
-            "board_w": 8,
-            "board_h": 8,
-            "extra_obstacles": False,
-            "obstacles_visible": True,
-            "return_to_start": False,
-            "timer_type": "stopwatch",
-            "timer_length": 5*60
-        }
-    elif mode == "hard":
-        settings = {
-            "board_w": 8,
-            "board_h": 8,
-            "extra_obstacles": True,
-            "obstacles_visible": False,
-            "return_to_start": True,
-            "timer_type": "countdown",
-            "timer_length": 5*60
-        }
+    if mode in MODE_SETTINGS:
+        settings = MODE_SETTINGS[mode]
     else:
         settings = pygame_custom_settings()
 
     pygame.init()
-    maze = generate_maze(settings)
+    maze = maze_for_settings(library, settings) if library is not None else None
+    if maze is None:
+        maze = wait_for_maze(pool, settings)
+    # One round per launch, so the workers can stop now
+    pool.close()
     board_w, board_h = maze["board_size"]
     sw = MARGIN*2 + board_w*SQUARE_SIZE + 160
     sh = MARGIN*2 + board_h*SQUARE_SIZE + 80
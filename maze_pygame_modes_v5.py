@@ -2,6 +2,11 @@ import pygame
 import random
 import time
 
+from knight_board import get_board
+from knight_distances import distance_grid
+from maze_library import load_library
+from maze_pool import MazePool
+
 # --- CONSTANTS ---
 MIN_SIZE = 6
 MAX_SIZE = 12
@@ -11,6 +16,7 @@ MARGIN = 20
 MENU_HEIGHT = 200
 END_HEIGHT = 20
 TIMER_DEFAULT = 5 * 60  # seconds
+CHECK_NODES = 2000  # maze search squares between timeout checks
 WIN_W = MAX_SIZE * SQUARE_SIZE + 2 * MARGIN
 WIN_H = MAX_SIZE * SQUARE_SIZE + MENU_HEIGHT + END_HEIGHT
 
@@ -34,21 +40,16 @@ SMALL_FONT = pygame.font.SysFont("arial", 16)
 BIG_FONT = pygame.font.SysFont("arial", 32)
 
 def knight_moves(x, y, n):
-    moves = [(2, 1), (1, 2), (-1, 2), (-2, 1),
-             (-2, -1), (-1, -2), (1, -2), (2, -1)]
-    return [(x + dx, y + dy) for dx, dy in moves if 0 <= x + dx < n and 0 <= y + dy < n]
+    return get_board(n).neighbour_coords[(x, y)]
 
 def find_valid_path_timed(n, min_len, max_len, timeout=15):
-    start_time = time.time()
-    while True:
-        # Try paths until found or timeout
-        result = find_valid_path(n, min_len, max_len, timeout=(timeout - (time.time()-start_time)))
+    # Keep drawing new start/target pairs until a path is found or time is up
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = find_valid_path(n, min_len, max_len, timeout=deadline - time.time())
         if result:
             return result
-        # If time exceeded, try again with new random parameters
-        if time.time() - start_time > timeout:
-            start_time = time.time()
-    return None, None, None
+    return None
 
 def find_valid_path(n, min_len, max_len, timeout=15):
     squares = [(x, y) for x in range(n) for y in range(n)]
@@ -68,34 +69,63 @@ def find_valid_path(n, min_len, max_len, timeout=15):
     return None
 
 def dfs_knight_path(start, target, n, min_len, max_len, timeout=15):
+    """Induced knight path from start to target with min_len..max_len squares.
+
+    No two path squares other than consecutive ones may be a knight move
+    apart. That is checked as each square is added, against a bitmask of the
+    squares attacked by the path before the current square, so the finished
+    path needs no validation. One path, visited mask and candidate list per
+    depth are shared by the whole search.
+    """
+    board = get_board(n)
+    s, t = board.index[start], board.index[target]
+    if s == t or max_len < 2:
+        return None
+    neighbours = board.neighbours
+    attacks = board.attacks
+    bits = board.bits
+    target_bit = bits[t]
+    dist = [d for row in distance_grid(n, n, target) for d in row]
+
+    def candidates(sq, visited, near, length):
+        # Squares that can follow sq when the path has length squares
+        if length >= max_len:
+            return []
+        if attacks[sq] & target_bit:
+            # Any other continuation would leave sq next to the target
+            return [t] if length + 1 >= min_len and not near & target_bit else []
+        closed = visited | near
+        # Popped last-first, so the knight_moves order is tried in reverse
+        return [u for u in neighbours[sq]
+                if not closed & bits[u] and 0 <= dist[u] <= max_len - length - 1]
+
+    path = [s]
+    visited_at = [bits[s]]
+    near_at = [0]  # squares attacked by path[:-1]
+    options = [candidates(s, bits[s], 0, 1)]
     start_time = time.time()
-    stack = [(start, [start])]
-    while stack:
-        if time.time() - start_time > timeout:
-            break
-        current, path = stack.pop()
-        if current == target and min_len <= len(path) <= max_len:
-            if path_degrees_okay(path, n):
-                return path
-        if len(path) >= max_len:
+    nodes = 0
+    while options:
+        if not options[-1]:
+            options.pop()
+            path.pop()
+            visited_at.pop()
+            near_at.pop()
             continue
-        for move in knight_moves(*current, n):
-            if move not in path:
-                stack.append((move, path + [move]))
+        u = options[-1].pop()
+        if u == t:
+            return [board.coords[sq] for sq in path] + [target]
+        nodes += 1
+        if nodes % CHECK_NODES == 0 and time.time() - start_time > timeout:
+            return None
+        near = near_at[-1] | attacks[path[-1]]
+        visited = visited_at[-1] | bits[u]
+        path.append(u)
+        visited_at.append(visited)
+        near_at.append(near)
+        options.append(candidates(u, visited, near, len(path)))
     return None
 
-def path_degrees_okay(path, n):
-    path_set = set(path)
-    for i, square in enumerate(path):
-        neighbors = [m for m in knight_moves(*square, n) if m in path_set]
-        if i == 0 or i == len(path)-1:  # Endpoints
-            if len(neighbors) != 1:
-                return False
-        else:
-            if len(neighbors) != 2:
-                return False
-    return True
-
 def draw_knight(screen, rect):
     pygame.draw.circle(screen, YELLOW, rect.center, rect.width//2 - 4)
     ktxt = FONT.render('K', True, BLACK)
@@ -243,9 +273,27 @@ def menu_loop(screen):
                 elif controls["start_button"].collidepoint(mx, my):
                     return board_size, timer_val, obstacles_visible, return_to_start
 
+def maze_params(n):
+    # (board size, min path squares, max path squares)
+    return n, n, 2*n
+
+def generate_maze_path(params):
+    # Maze pool worker: keep searching until a path turns up
+    n, min_len, max_len = params
+    while True:
+        result = find_valid_path_timed(n, min_len, max_len, timeout=15)
+        if result:
+            return result
+
 def main():
     screen = pygame.display.set_mode((WIN_W, WIN_H))
     pygame.display.set_caption("Knight's Maze")
+    # Mazes come from the prebuilt library if there is one, otherwise from
+    # background processes; the game only pops them
+    library = load_library()
+    pool = MazePool(generate_maze_path)
+    if library is None:
+        pool.request(maze_params(DEFAULT_SIZE))
 
     while True:
         menu_result = menu_loop(screen)
@@ -256,18 +304,20 @@ def main():
         # --- SETTING UP ---
         draw_setting_up(screen, timer_val)
         pygame.display.flip()
-        # Maze generation with timeout and retry
         n = board_size
-        min_len = n
-        max_len = 2*n
-        while True:
-            result = find_valid_path_timed(n, min_len, max_len, timeout=15)
+        maze = library.pick(n, n, "induced") if library is not None else None
+        if maze is not None:
+            start, target, maze_path = maze["start"], maze["target"], maze["maze_path"]
+        while maze is None:
+            result = pool.get(maze_params(n), timeout=0.1)
             if result:
                 start, target, maze_path = result
-                if maze_path:
-                    break
+                break
+            for ev in pygame.event.get():
+                if ev.type == pygame.QUIT:
+                    pool.close()
+                    return
             draw_setting_up(screen, timer_val)
-            pygame.display.flip()
         maze_path_set = set(maze_path)
         obstacles = set((x, y) for x in range(n) for y in range(n) if (x, y) not in maze_path_set)
         knight_pos = start
@@ -1,7 +1,9 @@
 import pygame
 import random
 import time
-from collections import deque
+
+from knight_distances import distance_grid
+from path_search import MAZE_NODE_BUDGET, find_exact_path
 
 # ---- Game settings ----
 BOARD_W, BOARD_H = 8, 8  # You can change these in 6-16 range
@@ -20,42 +22,11 @@ def is_valid(r, c, m, n):
     return 0 <= r < m and 0 <= c < n
 
 def min_moves_and_dist_matrix(m, n, start, end):
-    queue = deque()
-    queue.append(start)
-    dist = [[-1 for _ in range(n)] for _ in range(m)]
-    dist[start[0]][start[1]] = 0
-    while queue:
-        r, c = queue.popleft()
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and dist[nr][nc] == -1:
-                dist[nr][nc] = dist[r][c] + 1
-                queue.append((nr, nc))
+    dist = distance_grid(m, n, start)
     return dist[end[0]][end[1]], dist
 
 def find_knight_path_exact_x(m, n, start, end, x):
-    def backtrack(r, c, depth, path, visited):
-        if depth > x:
-            return None
-        if depth == x and (r, c) == end:
-            return path[:]
-        moves = knight_moves()
-        random.shuffle(moves)
-        for dr, dc in moves:
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and not visited[nr][nc]:
-                visited[nr][nc] = True
-                path.append((nr, nc))
-                result = backtrack(nr, nc, depth + 1, path, visited)
-                if result:
-                    return result
-                path.pop()
-                visited[nr][nc] = False
-        return None
-    visited = [[False for _ in range(n)] for _ in range(m)]
-    visited[start[0]][start[1]] = True
-    path = [start]
-    return backtrack(start[0], start[1], 0, path, visited)
+    return find_exact_path(m, n, start, end, x, rng=random, node_budget=MAZE_NODE_BUDGET)
 
 def squares_one_move_away(m, n, square):
     result = set()
@@ -101,23 +72,10 @@ def generate_maze(m=BOARD_W, n=BOARD_H):
         if tries > 1000:
             raise Exception("Maze path generation failed!")
     # Find shortest path squares (BFS layers)
-    shortest_path_layer = set()
-    queue = deque()
-    queue.append((start[0], start[1], 0))
-    shortest_path_layer.add(start)
-    visited = [[False for _ in range(n)] for _ in range(m)]
-    visited[start[0]][start[1]] = True
-    while queue:
-        r, c, d = queue.popleft()
-        if d > y:
-            continue
-        for dr, dc in knight_moves():
-            nr, nc = r + dr, c + dc
-            if is_valid(nr, nc, m, n) and dist_matrix[nr][nc] == dist_matrix[r][c] + 1:
-                shortest_path_layer.add((nr, nc))
-                if not visited[nr][nc]:
-                    visited[nr][nc] = True
-                    queue.append((nr, nc, d + 1))
+    shortest_path_layer = {
+        (r, c) for r in range(m) for c in range(n)
+        if 0 <= dist_matrix[r][c] <= y + 1
+    }
     maze_path_set = set(maze_path)
     obstacles = set()
     for sq in shortest_path_layer:
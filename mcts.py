@@ -0,0 +1,333 @@
+"""Monte Carlo tree search (UCT) player for the two-knight duels.
+
+Works for the plain Knight's Trap and the non-crossing game (whichever the
+DuelState plays). Each iteration walks down the tree by UCB1, adds one
+child, plays the game out with a cheap rollout policy for both knights and
+scores the result for the side to move at the root: 1 for a win (longer
+path), 0.5 for a draw, 0 for a loss. A knight with no move passes. Rollout
+policies, with random tie-breaks:
+
+    random        any legal move
+    warnsdorff    fewest onward moves (the default; fills a region well)
+    max_mobility  most onward moves
+
+Rollouts run on plain ints (visited squares and blocked edges) rather than
+through DuelState make/unmake. In the plain game onward moves are counted
+with a popcount of the target's attack mask.
+
+With workers > 1 the player uses root parallelization. Every process of a
+multiprocessing pool grows its own tree from the decision's position with
+its own seed until the shared deadline. The root visit counts are summed,
+and the most visited move is played. Give either a time budget per move or
+a fixed number of iterations per worker; only the latter is reproducible.
+
+    python mcts.py --budget 0.05 --workers 4 --trials 100
+    python mcts.py --iterations 500 --trials 100    # reproducible
+    python mcts.py --plain --player alphabeta --budget 0.05 --trials 100
+
+The command line plays Knight 2 (MCTS, alpha-beta with the same budget, or
+lookahead3) against a max-mobility Knight 1. The games run one at a time
+so that each decision can use the whole pool.
+"""
+
+import argparse
+import atexit
+import math
+import random
+import sys
+import time
+from functools import partial
+from multiprocessing import Pool
+
+from duel_state import DuelState
+from knight_board import KNIGHT_MOVES
+from trial_runner import make_rng, run_trials
+
+EXPLORATION = math.sqrt(2)
+IPC_MARGIN = 0.003    # seconds kept back from a pooled search for the round trip
+
+# --- Rollouts ---
+
+_MOVE_TABLES = {}
+
+def _move_table(state):
+    """Per square index: (target index, target bit, edge bit, edges it blocks, target's attacks)."""
+    key = (state.board, state.edges)
+    table = _MOVE_TABLES.get(key)
+    if table is None:
+        board, edges = state.board, state.edges
+        index, bits = board.index, board.bits
+        if edges is None:
+            table = [tuple((t, bits[t], 0, 0, board.attacks[t]) for t in board.neighbours[a]) for a in range(board.size)]
+        else:
+            table = [
+                tuple((index[t], bits[index[t]], edge_bit, edges.crossing[(a, t)], board.attacks[index[t]])
+                      for t, edge_bit in edges.moves[a])
+                for a in board.coords
+            ]
+        table = _MOVE_TABLES[key] = table
+    return table
+
+def _degree(table, mv, visited, blocked):
+    if not mv[2]:
+        # Plain game (no edge ids): the unvisited squares the target attacks
+        return bin(mv[4] & ~visited).count("1")
+    after, blocked_after = visited | mv[1], blocked | mv[3]
+    return sum(1 for nxt in table[mv[0]] if not (after & nxt[1] or blocked_after & nxt[2]))
+
+def rollout_random(table, moves, visited, blocked, rng):
+    return rng.choice(moves)
+
+def rollout_warnsdorff(table, moves, visited, blocked, rng):
+    degrees = [_degree(table, mv, visited, blocked) for mv in moves]
+    low = min(degrees)
+    return rng.choice([mv for mv, d in zip(moves, degrees) if d == low])
+
+def rollout_max_mobility(table, moves, visited, blocked, rng):
+    degrees = [_degree(table, mv, visited, blocked) for mv in moves]
+    high = max(degrees)
+    return rng.choice([mv for mv, d in zip(moves, degrees) if d == high])
+
+ROLLOUTS = {"random": rollout_random, "warnsdorff": rollout_warnsdorff, "max_mobility": rollout_max_mobility}
+
+def _play_out(state, to_move, policy, rng):
+    """Moves each side makes if the game from state is played out with policy."""
+    table = _move_table(state)
+    index = state.board.index
+    pos = [index[state.pos(0)], index[state.pos(1)]]
+    visited, blocked = state.visited, state.blocked
+    made = [0, 0]
+    stuck = 0
+    while stuck < 2:
+        moves = [mv for mv in table[pos[to_move]] if not (visited & mv[1] or blocked & mv[2])]
+        if moves:
+            mv = policy(table, moves, visited, blocked, rng)
+            visited |= mv[1]
+            blocked |= mv[3]
+            pos[to_move] = mv[0]
+            made[to_move] += 1
+            stuck = 0
+        else:
+            stuck += 1
+        to_move = 1 - to_move
+    return made
+
+# --- Tree search ---
+
+class _Node:
+    __slots__ = ("move", "mover", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, mover, parent):
+        self.move = move          # None for a pass
+        self.mover = mover        # side that made move; wins are from its view
+        self.parent = parent
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+def _options(state, to_move):
+    moves = state.legal_moves(to_move)
+    if moves:
+        return moves
+    # A pass if only the other knight can move, nothing if the game is over
+    return [None] if state.legal_moves(1 - to_move) else []
+
+def search(state, side, rng, deadline=None, iterations=None, rollout="warnsdorff", c=EXPLORATION):
+    """UCT from state with side to move; returns {move: (visits, wins)} at the root.
+
+    Stops at deadline (a time.time() value) or after iterations, whichever
+    comes first. state is restored before returning.
+    """
+    policy = ROLLOUTS[rollout]
+    root = _Node(None, 1 - side, None)
+    done = 0
+    while (iterations is None or done < iterations) and (deadline is None or time.time() < deadline):
+        done += 1
+        node = root
+        made = 0
+        # Selection and expansion
+        while True:
+            if node.untried is None:
+                node.untried = _options(state, 1 - node.mover)
+                rng.shuffle(node.untried)
+            if node.untried:
+                child = _Node(node.untried.pop(), 1 - node.mover, node)
+                node.children.append(child)
+                node = child
+                if node.move is not None:
+                    state.make_move(node.mover, node.move)
+                    made += 1
+                break
+            if not node.children:
+                break
+            log_n = math.log(node.visits)
+            node = max(node.children,
+                       key=lambda ch: ch.wins / ch.visits + c * math.sqrt(log_n / ch.visits))
+            if node.move is not None:
+                state.make_move(node.mover, node.move)
+                made += 1
+        # Rollout, scored for side
+        extra = _play_out(state, 1 - node.mover, policy, rng)
+        own = len(state.paths[side]) + extra[side]
+        opp = len(state.paths[1 - side]) + extra[1 - side]
+        result = 1.0 if own > opp else 0.5 if own == opp else 0.0
+        for _ in range(made):
+            state.unmake_move()
+        while node is not None:
+            node.visits += 1
+            node.wins += result if node.mover == side else 1.0 - result
+            node = node.parent
+    return {ch.move: (ch.visits, ch.wins) for ch in root.children}
+
+def _search_worker(args):
+    paths, m, n, deltas, non_crossing, side, seed, deadline, iterations, rollout, c = args
+    state = DuelState(paths[0][0], paths[1][0], m, n, deltas, non_crossing=non_crossing)
+    for s in (0, 1):
+        for sq in paths[s][1:]:
+            state.make_move(s, sq)
+    return search(state, side, random.Random(seed), deadline, iterations, rollout, c)
+
+class MCTSPlayer:
+    """UCT policy: choose(state, side) returns a move, like the heuristics.
+
+    time_budget is seconds per move, iterations the rollouts per worker (at
+    least one must be set). With workers > 1 the searches run in a process
+    pool; call close() (or use the player in a with block) when done.
+    """
+
+    def __init__(self, time_budget=0.05, iterations=None, rollout="warnsdorff", workers=1, c=EXPLORATION, seed=0):
+        if time_budget is None and iterations is None:
+            raise ValueError("need a time budget or an iteration count")
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.rollout = rollout
+        self.workers = workers
+        self.c = c
+        self.rng = random.Random(seed)
+        self.pool = Pool(workers) if workers > 1 else None
+        self.rollouts = 0
+
+    def choose(self, state, side, rng=None, **kwargs):
+        moves = state.legal_moves(side)
+        if len(moves) <= 1:
+            return moves[0] if moves else None
+        seeds = [self.rng.getrandbits(64) for _ in range(self.workers)]
+        deadline = None if self.time_budget is None else time.time() + self.time_budget
+        if self.pool is None:
+            results = [search(state, side, random.Random(seeds[0]), deadline, self.iterations, self.rollout, self.c)]
+        else:
+            board = state.board
+            paths = (list(state.paths[0]), list(state.paths[1]))
+            worker_deadline = None if deadline is None else deadline - IPC_MARGIN
+            results = self.pool.map(_search_worker, [
+                (paths, board.m, board.n, board.deltas, state.edges is not None, side, seed,
+                 worker_deadline, self.iterations, self.rollout, self.c)
+                for seed in seeds
+            ])
+        visits = dict.fromkeys(moves, 0)
+        wins = dict.fromkeys(moves, 0.0)
+        for result in results:
+            for move, (n, w) in result.items():
+                visits[move] += n
+                wins[move] += w
+        self.rollouts += sum(visits.values())
+        return max(moves, key=lambda m: (visits[m], wins[m]))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Experiment ---
+
+_PLAYERS = {}
+
+def _player(name, budget, workers, rollout, seed, iterations=None):
+    """Knight 2's choose function, set up for a new game.
+
+    MCTS with iterations runs that many per worker and ignores budget.
+    """
+    if name == "lookahead3":
+        import lookahead_3ply
+        return lookahead_3ply.heuristic_lookahead3
+    # One player per configuration and process, so the pool outlives a game
+    key = (name, budget, workers, rollout, iterations)
+    player = _PLAYERS.get(key)
+    if player is None:
+        if name == "mcts":
+            player = MCTSPlayer(None if iterations else budget, iterations, rollout=rollout, workers=workers)
+            atexit.register(player.close)
+        else:
+            from alphabeta import AlphaBeta
+            player = AlphaBeta(depth=None, time_budget=budget)
+        _PLAYERS[key] = player
+    if name == "mcts":
+        player.rng.seed(seed)
+    else:
+        # A fresh table per game, as for the other players
+        player.table.clear()
+        player.history.clear()
+    return player.choose
+
+def duel_trial(trial, seed, player, budget, workers, rollout, non_crossing, iterations=None):
+    """One game: max-mobility Knight 1 against player as Knight 2."""
+    from lookahead_3ply import heuristic_max_mobility
+    rng = make_rng(seed, "starts")
+    while True:
+        k1_start = (rng.randrange(8), rng.randrange(8))
+        k2_start = (rng.randrange(8), rng.randrange(8))
+        if k1_start != k2_start:
+            break
+    choose = _player(player, budget, workers, rollout, make_rng(seed, "k2", player).getrandbits(64), iterations)
+    state = DuelState(k1_start, k2_start, 8, deltas=KNIGHT_MOVES, non_crossing=non_crossing)
+    while True:
+        made_move = False
+        for side, policy in ((0, heuristic_max_mobility), (1, choose)):
+            move = policy(state, side)
+            if move is not None:
+                state.make_move(side, move)
+                made_move = True
+        if not made_move:
+            break
+    return len(state.paths[0]) - 1, len(state.paths[1]) - 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Knight 2 (MCTS or a baseline) against a max-mobility Knight 1 on 8x8.")
+    parser.add_argument("--player", choices=["mcts", "alphabeta", "lookahead3"], default="mcts")
+    parser.add_argument("--budget", type=float, default=0.05, help="seconds per move")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="MCTS iterations per worker and move instead of --budget (reproducible)")
+    parser.add_argument("--workers", type=int, default=1, help="processes searching each move (MCTS)")
+    parser.add_argument("--rollout", choices=list(ROLLOUTS), default="warnsdorff")
+    parser.add_argument("--plain", action="store_true", help="plain Knight's Trap instead of non-crossing")
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    func = partial(duel_trial, player=args.player, budget=args.budget, workers=args.workers,
+                   rollout=args.rollout, non_crossing=not args.plain, iterations=args.iterations)
+    t0 = time.time()
+    outcomes = run_trials(func, args.trials, seed=args.seed, experiment="mcts", workers=1)
+    results = list(outcomes.elements())
+    win_k1 = sum(1 for k1, k2 in results if k1 > k2)
+    win_k2 = sum(1 for k1, k2 in results if k2 > k1)
+    game = "plain" if args.plain else "non-crossing"
+    limit = f"{args.iterations} iterations" if args.iterations and args.player == "mcts" else f"{args.budget}s"
+    print(f"Knight 2: {args.player}, {limit} per move, {game} game")
+    print(f"Average moves: Knight 1 {sum(k1 for k1, _ in results) / args.trials:.2f}, "
+          f"Knight 2 {sum(k2 for _, k2 in results) / args.trials:.2f}")
+    print(f"Knight 1 win%: {100.0 * win_k1 / args.trials:.2f}")
+    print(f"Knight 2 win%: {100.0 * win_k2 / args.trials:.2f}")
+    print(f"Draw%:        {100.0 * (args.trials - win_k1 - win_k2) / args.trials:.2f}")
+    print(f"{time.time() - t0:.1f}s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Cross-entropy tuning of the metaheuristic's scoring weights by self-play.
+
+Each generation samples weight vectors from a Gaussian around the current
+mean (the mean itself is always a candidate) and races them: all surviving
+candidates play the same batch of duel_once games against the max-mobility
+Knight 1, scoring 1 / 0.5 / 0 per win / draw / loss for Knight 2. After each
+batch a candidate whose upper confidence bound falls below the lower bound
+of the n_elite-th best is dropped, so bad weights are discarded after a
+batch or two and the games go to the candidates that might be elites. Every
+candidate plays the same games (starts and rng streams come from the game
+index), so the differences come from the weights. The elites' mean and
+spread become the next Gaussian.
+
+The result is the Gaussian's mean, not the best-scoring candidate: every
+generation plays different games, so the highest score seen in any of them
+is mostly the luckiest one. The mean averages the elites of every
+generation, and it races as a candidate in the next one, which gives an
+honest score for it. Batches are run in parallel with
+trial_runner.run_trials. The mean is written after every generation, so an
+overnight run can be stopped at any time:
+
+    python metaheuristic_tuning.py --hours 8 --output metaheuristic_weights.json
+    python noncrossing_metaheuristic.py --weights metaheuristic_weights.json
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from functools import partial
+
+from noncrossing_metaheuristic import DEFAULT_WEIGHTS, run_trial
+from trial_runner import derive_seed, run_trials
+
+NAMES = list(DEFAULT_WEIGHTS)
+POINTS = {"win": 1.0, "draw": 0.5, "loss": 0.0}
+
+def _race_game(trial, seed, candidates, first_game, batch, master_seed):
+    # Trial i is game first_game + i % batch for candidate i // batch; the
+    # game seed ignores the candidate so all candidates play the same games
+    index, game = divmod(trial, batch)
+    weights = dict(zip(NAMES, candidates[index]))
+    k1_len, k2_len = run_trial(first_game + game, derive_seed(master_seed, "game", first_game + game), weights)
+    result = "win" if k2_len > k1_len else "loss" if k2_len < k1_len else "draw"
+    return index, result
+
+class Candidate:
+    def __init__(self, vector):
+        self.vector = vector
+        self.results = Counter()
+        self.alive = True
+
+    @property
+    def games(self):
+        return sum(self.results.values())
+
+    @property
+    def score(self):
+        """Mean points per game for Knight 2."""
+        return sum(POINTS[r] * n for r, n in self.results.items()) / max(1, self.games)
+
+    def bounds(self, z):
+        n = self.games
+        mean = self.score
+        var = sum(n_r * (POINTS[r] - mean) ** 2 for r, n_r in self.results.items()) / max(1, n - 1)
+        half = z * math.sqrt(var / max(1, n))
+        return mean - half, mean + half
+
+def race(candidates, n_elite, batch, max_games, first_game, seed, z=2.0, workers=None):
+    """Play batches until max_games each or only n_elite candidates survive."""
+    game = first_game
+    while True:
+        alive = [c for c in candidates if c.alive]
+        vectors = [c.vector for c in alive]
+        func = partial(_race_game, candidates=vectors, first_game=game, batch=batch, master_seed=seed)
+        outcomes = run_trials(func, batch * len(alive), seed=seed, experiment="metaheuristic_tuning", workers=workers)
+        for (index, result), count in outcomes.items():
+            alive[index].results[result] += count
+        game += batch
+        if alive[0].games >= max_games or len(alive) <= n_elite:
+            return game
+        # Sequential test: drop candidates that cannot reach the elite cut-off
+        lower = sorted((c.bounds(z)[0] for c in alive), reverse=True)
+        cutoff = lower[n_elite - 1]
+        for c in alive:
+            if c.bounds(z)[1] < cutoff:
+                c.alive = False
+
+def write_weights(path, vector, info):
+    with open(path, "w") as f:
+        json.dump({**dict(zip(NAMES, vector)), "tuning": info}, f, indent=2)
+        f.write("\n")
+
+def tune(output, generations=50, population=16, n_elite=4, batch=40, max_games=400, sigma=1.0,
+         min_sigma=0.05, smoothing=0.7, hours=None, seed=0, workers=None, z=2.0):
+    """Cross-entropy search; returns the final mean weight vector."""
+    rng = random.Random(seed)
+    mean = [DEFAULT_WEIGHTS[name] for name in NAMES]
+    sigmas = [sigma] * len(NAMES)
+    game = 0
+    deadline = time.time() + 3600 * hours if hours else None
+    print(f"{'gen':>3} {'alive':>5} {'games':>6} {'top':>6} {'mean sigma':>10}  weights")
+    for generation in range(generations):
+        t0 = time.time()
+        candidates = [Candidate(list(mean))]
+        candidates += [Candidate([rng.gauss(m, s) for m, s in zip(mean, sigmas)]) for _ in range(population - 1)]
+        game = race(candidates, n_elite, batch, max_games, game, seed, z, workers)
+
+        # Survivors have played the most games; rank them first, then by score
+        ranked = sorted(candidates, key=lambda c: (c.alive, c.score), reverse=True)
+        elites = ranked[:n_elite]
+        top = elites[0]
+        # candidates[0] is the mean this generation started from, scored on
+        # the same games as the others
+        entering = candidates[0]
+        for i in range(len(NAMES)):
+            values = [c.vector[i] for c in elites]
+            elite_mean = sum(values) / n_elite
+            elite_sd = math.sqrt(sum((v - elite_mean) ** 2 for v in values) / n_elite)
+            mean[i] = smoothing * elite_mean + (1 - smoothing) * mean[i]
+            sigmas[i] = max(min_sigma, smoothing * elite_sd + (1 - smoothing) * sigmas[i])
+
+        write_weights(output, mean, {
+            "generation": generation, "games_played": sum(c.games for c in candidates), "seed": seed,
+            "search_sigma": dict(zip(NAMES, sigmas)),
+            "previous_mean": {"weights": dict(zip(NAMES, entering.vector)), "score": entering.score,
+                              "games": entering.games},
+            "generation_top": {"weights": dict(zip(NAMES, top.vector)), "score": top.score, "games": top.games},
+        })
+        survivors = sum(c.alive for c in candidates)
+        print(f"{generation:3} {survivors:5} {sum(c.games for c in candidates):6} {top.score:6.3f} "
+              f"{sum(sigmas) / len(sigmas):10.3f}  {' '.join(f'{v:+.2f}' for v in top.vector)}"
+              f"  ({time.time() - t0:.0f}s)")
+        if max(sigmas) <= min_sigma:
+            print("Converged")
+            break
+        if deadline is not None and time.time() > deadline:
+            print("Time budget used up")
+            break
+    print(f"Mean weights written to {output}")
+    return mean
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the metaheuristic weights by self-play.")
+    parser.add_argument("--output", default="metaheuristic_weights.json")
+    parser.add_argument("--generations", type=int, default=50)
+    parser.add_argument("--population", type=int, default=16)
+    parser.add_argument("--elite", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=40, help="games per candidate between elimination tests")
+    parser.add_argument("--max-games", type=int, default=400, help="games per candidate and generation")
+    parser.add_argument("--sigma", type=float, default=1.0, help="initial standard deviation of every weight")
+    parser.add_argument("--z", type=float, default=2.0, help="confidence bound width in standard errors")
+    parser.add_argument("--hours", type=float, default=None, help="stop after the generation that passes this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    tune(args.output, args.generations, args.population, args.elite, args.batch, args.max_games,
+         args.sigma, hours=args.hours, seed=args.seed, workers=args.workers, z=args.z)
+
+if __name__ == "__main__":
+    sys.exit(main())
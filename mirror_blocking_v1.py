@@ -1,4 +1,6 @@
-import random
+from functools import partial
+
+from trial_runner import make_rng, run_trials
 
 BOARD_SIZE = 8
 TRIALS = 5000
@@ -9,7 +11,8 @@ def sigma(pos):
     return (r, 9 - c)
 
 class Game:
-    def __init__(self, blockade_seq):
+    def __init__(self, blockade_seq, rng):
+        self.rng = rng
         self.visited = set()
         self.p1_pos = blockade_seq[0]
         self.p2_pos = sigma(self.p1_pos)
@@ -21,7 +24,7 @@ class Game:
         if self.turn < len(self.blockade_seq):
             new_p1 = self.blockade_seq[self.turn]
         else:
-            new_p1 = random.choice(self.legal_knight_moves(self.p1_pos))
+            new_p1 = self.rng.choice(self.legal_knight_moves(self.p1_pos))
         self.visited.add(new_p1)
         self.p1_pos = new_p1
 
@@ -45,16 +48,18 @@ class Game:
                 moves.append((nr, nc))
         return moves
 
-def run_simulation(blockade_seq):
-    failures = []
-    for _ in range(TRIALS):
-        game = Game(blockade_seq)
-        while True:
-            result = game.step()
-            if result is not None:
-                failures.append(result)
-                break
-    return sum(failures) / len(failures)
+def run_trial(trial, seed, blockade_seq):
+    game = Game(blockade_seq, make_rng(seed, "p1"))
+    while True:
+        result = game.step()
+        if result is not None:
+            return result
+
+def run_simulation(name, blockade_seq):
+    # Counter of the turn at which the mirror broke, one stream per sequence
+    failures = run_trials(partial(run_trial, blockade_seq=blockade_seq), TRIALS,
+                          experiment=f"mirror_blocking_v1/{name}")
+    return sum(turn * count for turn, count in failures.items()) / TRIALS
 
 # Example blockade sequences (must be defined as lists of coords)
 bridge_block_seq       = [(4,4),(5,6),(6,4)]  # fill in
@@ -62,11 +67,12 @@ parity_flip_loop_seq   = [(3,3),(5,4),(4,6),(6,5)]
 corridor_cutting_seq   = [(2,3),(4,4),(6,3),(8,4)]
 sacrificial_choke_seq  = [(4,5),(5,7),(3,6),(2,4)]
 
-results = {
-    "Bridge-Block": run_simulation(bridge_block_seq),
-    "Parity-Flip Loop": run_simulation(parity_flip_loop_seq),
-    "Corridor-Cutting": run_simulation(corridor_cutting_seq),
-    "Sacrificial Chokepoint": run_simulation(sacrificial_choke_seq),
-}
+if __name__ == "__main__":
+    results = {
+        "Bridge-Block": run_simulation("Bridge-Block", bridge_block_seq),
+        "Parity-Flip Loop": run_simulation("Parity-Flip Loop", parity_flip_loop_seq),
+        "Corridor-Cutting": run_simulation("Corridor-Cutting", corridor_cutting_seq),
+        "Sacrificial Chokepoint": run_simulation("Sacrificial Chokepoint", sacrificial_choke_seq),
+    }
 
-print(results)
\ No newline at end of file
+    print(results)
\ No newline at end of file
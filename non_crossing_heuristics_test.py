@@ -1,4 +1,15 @@
-import random
+import argparse
+import csv
+import time
+import tracemalloc
+from functools import partial
+
+from duel_state import DuelState
+from transposition import best_lookahead_move
+from trial_runner import derive_seed, make_rng, run_trials
+
+EXPERIMENT = "non_crossing_heuristics_test"
+SEED = 42
 
 BOARD_SIZE = 8
 KNIGHT_MOVES = [
@@ -6,93 +17,58 @@ KNIGHT_MOVES = [
     (1, -2), (2, -1), (-1, -2), (-2, -1)
 ]
 
-def is_valid_square(r, c):
-    return 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE
-
-def random_square():
-    return (random.randint(0, BOARD_SIZE-1), random.randint(0, BOARD_SIZE-1))
-
-def segments_from_path(path):
-    return [(path[i][0], path[i][1], path[i+1][0], path[i+1][1])
-            for i in range(len(path)-1)]
-
-def segments_cross(seg1, seg2):
-    def ccw(A,B,C):
-        return (C[1]-A[1])*(B[0]-A[0]) > (B[1]-A[1])*(C[0]-A[0])
-    A, B = (seg1[0],seg1[1]), (seg1[2],seg1[3])
-    C, D = (seg2[0],seg2[1]), (seg2[2],seg2[3])
-    if A == C or A == D or B == C or B == D:
-        return False
-    return (ccw(A,C,D) != ccw(B,C,D)) and (ccw(A,B,C) != ccw(A,B,D))
-
-def crosses_any(new_seg, all_segs):
-    for seg in all_segs:
-        if segments_cross(new_seg, seg):
-            return True
-    return False
-
-def knight_legal_moves(pos, visited, all_segs):
-    moves = []
-    for dr, dc in KNIGHT_MOVES:
-        nr, nc = pos[0]+dr, pos[1]+dc
-        if not is_valid_square(nr, nc):
-            continue
-        if (nr, nc) in visited:
-            continue
-        new_seg = (pos[0], pos[1], nr, nc)
-        if crosses_any(new_seg, all_segs):
-            continue
-        moves.append((nr, nc))
-    return moves
+def random_square(rng):
+    return (rng.randint(0, BOARD_SIZE-1), rng.randint(0, BOARD_SIZE-1))
 
 # Heuristic functions for Knight 2
-def heuristic_max_mobility(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+# Each takes the shared DuelState and the side to move, and probes candidate
+# moves with make_move/unmake_move instead of copying visited squares/segments.
+def heuristic_max_mobility(state, side, rng, **kwargs):
+    moves = state.legal_moves(side)
     if not moves:
         return None
-    next_counts = [len(knight_legal_moves(m, visited | {m}, all_segs + [(pos[0], pos[1], m[0], m[1])])) for m in moves]
+    next_counts = [state.mobility_after(side, m) for m in moves]
     max_count = max(next_counts)
     for m, cnt in zip(moves, next_counts):
         if cnt == max_count:
             return m
     return moves[0]
 
-def heuristic_warnsdorff(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_warnsdorff(state, side, rng, **kwargs):
+    moves = state.legal_moves(side)
     if not moves:
         return None
-    next_counts = [len(knight_legal_moves(m, visited | {m}, all_segs + [(pos[0], pos[1], m[0], m[1])])) for m in moves]
+    next_counts = [state.mobility_after(side, m) for m in moves]
     min_count = min(next_counts)
     for m, cnt in zip(moves, next_counts):
         if cnt == min_count:
             return m
     return moves[0]
 
-def heuristic_blocking(pos, visited, all_segs, opp_pos=None, opp_visited=None, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_blocking(state, side, rng, **kwargs):
+    moves = state.legal_moves(side)
     if not moves:
         return None
     opp_next_counts = []
     for m in moves:
-        new_visited = visited | {m}
-        new_segs = all_segs + [(pos[0], pos[1], m[0], m[1])]
-        opp_moves = knight_legal_moves(opp_pos, opp_visited | new_visited, new_segs)
-        opp_next_counts.append(len(opp_moves))
+        state.make_move(side, m)
+        opp_next_counts.append(len(state.legal_moves(1 - side)))
+        state.unmake_move()
     min_opp_count = min(opp_next_counts)
     for m, cnt in zip(moves, opp_next_counts):
         if cnt == min_opp_count:
             return m
     return moves[0]
 
-def heuristic_random(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_random(state, side, rng, **kwargs):
+    moves = state.legal_moves(side)
     if not moves:
         return None
-    return random.choice(moves)
+    return rng.choice(moves)
 
-def heuristic_center_control(pos, visited, all_segs, **kwargs):
+def heuristic_center_control(state, side, rng, **kwargs):
     # Prefer moves closer to the board center (3.5, 3.5)
-    moves = knight_legal_moves(pos, visited, all_segs)
+    moves = state.legal_moves(side)
     if not moves:
         return None
     center = (3.5, 3.5)
@@ -103,9 +79,9 @@ def heuristic_center_control(pos, visited, all_segs, **kwargs):
             return m
     return moves[0]
 
-def heuristic_edge_avoidance(pos, visited, all_segs, **kwargs):
+def heuristic_edge_avoidance(state, side, rng, **kwargs):
     # Avoid edges: penalize moves close to the board sides
-    moves = knight_legal_moves(pos, visited, all_segs)
+    moves = state.legal_moves(side)
     if not moves:
         return None
     edge_penalties = [min(m[0], BOARD_SIZE-1-m[0], m[1], BOARD_SIZE-1-m[1]) for m in moves]
@@ -115,78 +91,157 @@ def heuristic_edge_avoidance(pos, visited, all_segs, **kwargs):
             return m
     return moves[0]
 
-def heuristic_lookahead2(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
-    if not moves:
-        return None
+def heuristic_lookahead2(state, side, rng, table=None, depth=2, **kwargs):
     # For each move, look ahead 2 turns: pick move maximizing min of possible second moves
-    best_move = moves[0]
-    best_score = -1
-    for m in moves:
-        new_visited = visited | {m}
-        new_segs = all_segs + [(pos[0], pos[1], m[0], m[1])]
-        next_moves = knight_legal_moves(m, new_visited, new_segs)
-        if not next_moves:
-            score = 0
-        else:
-            # For each next-move, how many onward moves?
-            next_scores = [len(knight_legal_moves(nm, new_visited | {nm}, new_segs + [(m[0], m[1], nm[0], nm[1])])) for nm in next_moves]
-            score = min(next_scores)
-        if score > best_score:
-            best_score = score
-            best_move = m
-    return best_move
-
-def heuristic_mirror(pos, visited, all_segs, opp_pos=None, **kwargs):
+    return best_lookahead_move(state, side, depth, table)
+
+def heuristic_mirror(state, side, rng, **kwargs):
     # Try to mirror Knight 1's move if possible (if symmetric square is available)
-    moves = knight_legal_moves(pos, visited, all_segs)
+    moves = state.legal_moves(side)
     if not moves:
         return None
     # Calculate knight 1's offset from board center, try to copy that offset
     center = (3.5, 3.5)
+    opp_pos = state.pos(1 - side)
     opp_offset = (opp_pos[0] - center[0], opp_pos[1] - center[1])
     mirror_pos = (int(center[0] - opp_offset[0]), int(center[1] - opp_offset[1]))
     if mirror_pos in moves:
         return mirror_pos
     # If not possible, just use max-mobility
-    return heuristic_max_mobility(pos, visited, all_segs)
+    return heuristic_max_mobility(state, side, rng)
 
-def duel_once(k1_start, k2_start, k2_heuristic_func):
-    k1_path = [k1_start]
-    k2_path = [k2_start]
-    k1_visited = set([k1_start])
-    k2_visited = set([k2_start])
+def duel_once(k1_start, k2_start, k2_heuristic_func, k1_rng, k2_rng, profile=None):
+    # With a HeuristicProfile, Knight 2's decisions are timed and counted
+    if profile is None:
+        state = DuelState(k1_start, k2_start, BOARD_SIZE, deltas=KNIGHT_MOVES)
+    else:
+        state = CountingDuelState(k1_start, k2_start, BOARD_SIZE, deltas=KNIGHT_MOVES)
     while True:
         made_move = False
         # K1 always uses max-mobility
-        pos = k1_path[-1]
-        all_segs = segments_from_path(k1_path) + segments_from_path(k2_path)
-        moves = knight_legal_moves(pos, k1_visited | k2_visited, all_segs)
-        if moves:
-            next_counts = [len(knight_legal_moves(m, k1_visited | k2_visited | {m}, all_segs + [(pos[0], pos[1], m[0], m[1])])) for m in moves]
-            max_count = max(next_counts)
-            for m, cnt in zip(moves, next_counts):
-                if cnt == max_count:
-                    best_move = m
-                    break
-            k1_path.append(best_move)
-            k1_visited.add(best_move)
+        best_move = heuristic_max_mobility(state, 0, k1_rng)
+        if best_move is not None:
+            state.make_move(0, best_move)
             made_move = True
         # K2 uses variable heuristic
-        pos2 = k2_path[-1]
-        all_segs = segments_from_path(k1_path) + segments_from_path(k2_path)
-        moves2 = knight_legal_moves(pos2, k1_visited | k2_visited, all_segs)
-        if moves2:
-            params = {"opp_pos": k1_path[-1], "opp_visited": k1_visited}
-            best_move2 = k2_heuristic_func(pos2, k1_visited | k2_visited, all_segs, **params)
-            k2_path.append(best_move2)
-            k2_visited.add(best_move2)
+        if profile is None:
+            best_move2 = k2_heuristic_func(state, 1, k2_rng)
+        else:
+            best_move2 = profile.decide(k2_heuristic_func, state, k2_rng)
+        if best_move2 is not None:
+            state.make_move(1, best_move2)
             made_move = True
         if not made_move:
             break
-    return len(k1_path), len(k2_path)
+    return len(state.paths[0]), len(state.paths[1])
+
+def run_trial(trial, seed, k2_heuristic_func, profile=None):
+    # Separate streams for the start squares and for each knight's heuristic
+    rng = make_rng(seed, "starts")
+    while True:
+        k1_start = random_square(rng)
+        k2_start = random_square(rng)
+        if k1_start != k2_start:
+            break
+    k1_rng = make_rng(seed, "k1", heuristic_max_mobility.__name__)
+    k2_rng = make_rng(seed, "k2", k2_heuristic_func.__name__)
+    return duel_once(k1_start, k2_start, k2_heuristic_func, k1_rng, k2_rng, profile)
+
+# --- Cost profiling ---
+class CountingDuelState(DuelState):
+    """DuelState that counts move generation work.
+
+    Crossing checks are the candidate moves tested against the blocked-edge
+    bitset, which is what replaced the old per-segment segments_cross calls.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.legal_moves_calls = 0
+        self.make_move_calls = 0
+        self.crossing_checks = 0
+
+    def legal_moves(self, side):
+        self.legal_moves_calls += 1
+        self.crossing_checks += len(self.edges.moves[self.paths[side][-1]])
+        return super().legal_moves(side)
+
+    def make_move(self, side, sq):
+        self.make_move_calls += 1
+        super().make_move(side, sq)
+
+class HeuristicProfile:
+    """Cost of one heuristic's decisions, summed over the profiled games.
+
+    With allocations, tracemalloc must be running; the peak memory each
+    decision allocates on top of what was live before it is added up.
+    """
+
+    def __init__(self, allocations=False):
+        self.allocations = allocations
+        self.decisions = 0
+        self.seconds = 0.0
+        self.legal_moves = 0
+        self.make_move = 0
+        self.crossing_checks = 0
+        self.peak_bytes = 0
+
+    def decide(self, func, state, rng):
+        counts = state.legal_moves_calls, state.make_move_calls, state.crossing_checks
+        if self.allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        move = func(state, 1, rng)
+        self.seconds += time.perf_counter() - t0
+        if self.allocations:
+            self.peak_bytes += tracemalloc.get_traced_memory()[1] - before
+        self.decisions += 1
+        self.legal_moves += state.legal_moves_calls - counts[0]
+        self.make_move += state.make_move_calls - counts[1]
+        self.crossing_checks += state.crossing_checks - counts[2]
+        return move
+
+def profile_heuristic(func, trials, allocations=True):
+    """Per-decision costs of func over the first trials games of the experiment.
+
+    Runs in this process, replaying the experiment's trial seeds. Time and
+    call counts come from a plain pass; allocations from a second pass under
+    tracemalloc, which would otherwise slow the timed pass down.
+    """
+    profile = HeuristicProfile()
+    for trial in range(trials):
+        run_trial(trial, derive_seed(SEED, EXPERIMENT, trial), func, profile)
+    per_decision = max(1, profile.decisions)
+    row = {
+        "decisions": profile.decisions,
+        "us_per_decision": 1e6 * profile.seconds / per_decision,
+        "legal_moves_per_decision": profile.legal_moves / per_decision,
+        "make_move_per_decision": profile.make_move / per_decision,
+        "crossing_checks_per_decision": profile.crossing_checks / per_decision,
+        "peak_bytes_per_decision": None,
+    }
+    if allocations:
+        profile = HeuristicProfile(allocations=True)
+        tracemalloc.start()
+        try:
+            for trial in range(trials):
+                run_trial(trial, derive_seed(SEED, EXPERIMENT, trial), func, profile)
+        finally:
+            tracemalloc.stop()
+        row["peak_bytes_per_decision"] = profile.peak_bytes / max(1, profile.decisions)
+    return row
+
+def write_costs_csv(path, costs):
+    fields = ["heuristic"] + list(next(iter(costs.values())))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        for display, row in costs.items():
+            writer.writerow({"heuristic": display, **row})
 
-def run_experiment(trials=100):
+def run_experiment(trials=100, workers=None, profile_trials=100, allocations=True, csv_path=None):
+    # profile_trials > 0 adds a per-decision cost table for Knight 2's heuristic
     heuristics = [
         ("Max-mobility", heuristic_max_mobility),
         ("Warnsdorff (Min-mobility)", heuristic_warnsdorff),
@@ -198,20 +253,15 @@ def run_experiment(trials=100):
         ("Mirror", heuristic_mirror),
     ]
     results = {}
-    random.seed(42)
     for display, func in heuristics:
         k1_counts = []
         k2_counts = []
         win_k1 = 0
         win_k2 = 0
         draws = 0
-        for trial in range(trials):
-            while True:
-                k1_start = random_square()
-                k2_start = random_square()
-                if k1_start != k2_start:
-                    break
-            k1len, k2len = duel_once(k1_start, k2_start, k2_heuristic_func=func)
+        # Same master seed for every heuristic, so trial i uses the same starts
+        outcomes = run_trials(partial(run_trial, k2_heuristic_func=func), trials, seed=SEED, experiment=EXPERIMENT, workers=workers)
+        for k1len, k2len in outcomes.elements():
             k1_counts.append(k1len)
             k2_counts.append(k2len)
             if k1len > k2len:
@@ -248,7 +298,27 @@ def run_experiment(trials=100):
         for moves in all_lengths:
             print(f"{display:<22} | {moves:5} | {k1_count.get(moves,0):8} | {k2_count.get(moves,0):8}")
         print("------------------------------------------------------")
+    if profile_trials:
+        costs = {display: profile_heuristic(func, profile_trials, allocations) for display, func in heuristics}
+        print(f"\nKnight 2 cost per decision (first {profile_trials} games, one process):\n")
+        print("Heuristic               | us/dec  | legal_moves | make_move | crossing chk | peak KiB")
+        print("--------------------------------------------------------------------------------------")
+        for display, row in costs.items():
+            peak = row["peak_bytes_per_decision"]
+            peak = f"{peak / 1024:8.2f}" if peak is not None else f"{'-':>8}"
+            print(f"{display:<22} | {row['us_per_decision']:7.1f} | {row['legal_moves_per_decision']:11.1f} | "
+                  f"{row['make_move_per_decision']:9.1f} | {row['crossing_checks_per_decision']:12.1f} | {peak}")
+        if csv_path:
+            write_costs_csv(csv_path, costs)
+            print(f"\nCosts written to {csv_path}")
     print("\nDone.")
 
 if __name__ == "__main__":
-    run_experiment(trials=1000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Knight 2 heuristics against a max-mobility Knight 1.")
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--profile-trials", type=int, default=100, help="games replayed for the cost table (0 to skip)")
+    parser.add_argument("--no-allocations", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--csv", help="write the cost table to this CSV file")
+    args = parser.parse_args()
+    run_experiment(args.trials, args.workers, args.profile_trials, not args.no_allocations, args.csv)
\ No newline at end of file
@@ -1,4 +1,5 @@
-import random
+from duel_state import DuelState
+from trial_runner import make_rng, run_trials
 
 BOARD_SIZE = 16
 KNIGHT_MOVES = [
@@ -6,83 +7,36 @@ KNIGHT_MOVES = [
     (1, -2), (2, -1), (-1, -2), (-2, -1)
 ]
 
-def is_valid_square(r, c):
-    return 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE
-
-def random_square():
-    return random.randint(0, BOARD_SIZE - 1), random.randint(0, BOARD_SIZE - 1)
-
-def segments_from_path(path):
-    return [(path[i][0], path[i][1], path[i+1][0], path[i+1][1])
-            for i in range(len(path)-1)]
-
-def segments_cross(seg1, seg2):
-    def ccw(A,B,C):
-        return (C[1]-A[1])*(B[0]-A[0]) > (B[1]-A[1])*(C[0]-A[0])
-    A, B = (seg1[0],seg1[1]), (seg1[2],seg1[3])
-    C, D = (seg2[0],seg2[1]), (seg2[2],seg2[3])
-    if A == C or A == D or B == C or B == D:
-        return False
-    return (ccw(A,C,D) != ccw(B,C,D)) and (ccw(A,B,C) != ccw(A,B,D))
-
-def crosses_any(new_seg, all_segs):
-    for seg in all_segs:
-        if segments_cross(new_seg, seg):
-            return True
-    return False
-
-def knight_legal_moves(pos, visited, all_segs):
-    moves = []
-    for dr, dc in KNIGHT_MOVES:
-        nr, nc = pos[0]+dr, pos[1]+dc
-        if not is_valid_square(nr, nc):
-            continue
-        if (nr, nc) in visited:
-            continue
-        new_seg = (pos[0], pos[1], nr, nc)
-        if crosses_any(new_seg, all_segs):
-            continue
-        moves.append((nr, nc))
-    return moves
+def random_square(rng):
+    return rng.randint(0, BOARD_SIZE - 1), rng.randint(0, BOARD_SIZE - 1)
 
 def duel_once(k1_start, k2_start):
-    k1_path = [k1_start]
-    k2_path = [k2_start]
-    k1_visited = {k1_start}
-    k2_visited = {k2_start}
+    state = DuelState(k1_start, k2_start, BOARD_SIZE, deltas=KNIGHT_MOVES)
     while True:
         made_move = False
-        for path, visited, other_path, other_visited in [
-            (k1_path, k1_visited, k2_path, k2_visited),
-            (k2_path, k2_visited, k1_path, k1_visited)
-        ]:
-            pos = path[-1]
-            all_segs = segments_from_path(k1_path) + segments_from_path(k2_path)
-            moves = knight_legal_moves(pos, visited | other_visited, all_segs)
+        for side in (0, 1):
+            moves = state.legal_moves(side)
             if moves:
-                best_move = max(moves, key=lambda m:
-                    len(knight_legal_moves(m, visited | other_visited | {m},
-                        all_segs + [(pos[0], pos[1], m[0], m[1])])
-                ))
-                path.append(best_move)
-                visited.add(best_move)
+                best_move = max(moves, key=lambda m: state.mobility_after(side, m))
+                state.make_move(side, best_move)
                 made_move = True
         if not made_move:
             break
-    return len(k1_path), len(k2_path)
+    return len(state.paths[0]), len(state.paths[1])
+
+def run_trial(trial, seed):
+    rng = make_rng(seed, "starts")
+    while True:
+        k1_start = random_square(rng)
+        k2_start = random_square(rng)
+        if k1_start != k2_start:
+            break
+    return duel_once(k1_start, k2_start)
 
-def main():
-    random.seed(42)
+def main(workers=None):
     TRIALS = 10000
-    results = []
-    for trial in range(TRIALS):
-        while True:
-            k1_start = random_square()
-            k2_start = random_square()
-            if k1_start != k2_start:
-                break
-        k1len, k2len = duel_once(k1_start, k2_start)
-        results.append((k1len, k2len))
+    outcomes = run_trials(run_trial, TRIALS, seed=42, experiment="non_crossing_paths_test", workers=workers)
+    results = list(outcomes.elements())
     # Aggregate stats for number of moves for each knight
     from collections import Counter, defaultdict
     k1_moves_counter = Counter()
@@ -1,4 +1,11 @@
-import random
+import argparse
+import json
+from functools import partial
+
+from duel_state import DuelState
+from regions import region_score
+from transposition import lookahead_value
+from trial_runner import make_rng, run_trials
 
 BOARD_SIZE = 8
 KNIGHT_MOVES = [
@@ -6,146 +13,197 @@ KNIGHT_MOVES = [
     (1, -2), (2, -1), (-1, -2), (-2, -1)
 ]
 
-def is_valid_square(r, c):
-    return 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE
+# Scoring weights of the metaheuristic; metaheuristic_tuning.py searches for
+# better ones and writes them to a JSON file that load_weights reads.
+DEFAULT_WEIGHTS = {
+    "own_mobility": 2.0,
+    "opp_mobility": -1.0,
+    "center": 0.5,
+    "edge": 0.5,
+    "parity": 0.25,
+    "region": 0.0,
+}
+# "region" scores regions.region_score after the move. At 1.0 Knight 2 wins
+# about 63% of games instead of 35%, but each decision takes 3-4x as long.
+
+def load_weights(path):
+    """Weights from a JSON file; names it does not set keep their defaults."""
+    with open(path) as f:
+        data = json.load(f)
+    weights = dict(DEFAULT_WEIGHTS)
+    for name in DEFAULT_WEIGHTS:
+        if name in data:
+            weights[name] = float(data[name])
+    return weights
+
+def random_square(rng):
+    return (rng.randint(0, BOARD_SIZE-1), rng.randint(0, BOARD_SIZE-1))
+
+# --- Per-decision cache ---
+class DecisionCache:
+    """Move evaluations for one decision, shared by the heuristics and the scoring.
+
+    The metaheuristic's heuristics all probe the same moves; with one cache per
+    decision each of legal moves, the mover's replies after a move (one-ply
+    mobility), the opponent's mobility after it and the lookahead3 and region
+    scores of it is computed once. A TranspositionTable, if given, keeps
+    lookahead3 scores across decisions.
+    """
 
-def random_square():
-    return (random.randint(0, BOARD_SIZE-1), random.randint(0, BOARD_SIZE-1))
+    def __init__(self, state, side, table=None):
+        self.state = state
+        self.side = side
+        self.table = table
+        self.moves = state.legal_moves(side)
+        self._replies = {}
+        self._opp_mobility = {}
+        self._lookahead3 = {}
+        self._region = {}
 
-def segments_from_path(path):
-    return [(path[i][0], path[i][1], path[i+1][0], path[i+1][1])
-            for i in range(len(path)-1)]
+    def replies(self, move):
+        """The mover's legal moves after move."""
+        replies = self._replies.get(move)
+        if replies is None:
+            self.state.make_move(self.side, move)
+            replies = self.state.legal_moves(self.side)
+            self.state.unmake_move()
+            self._replies[move] = replies
+        return replies
 
-def segments_cross(seg1, seg2):
-    def ccw(A,B,C):
-        return (C[1]-A[1])*(B[0]-A[0]) > (B[1]-A[1])*(C[0]-A[0])
-    A, B = (seg1[0],seg1[1]), (seg1[2],seg1[3])
-    C, D = (seg2[0],seg2[1]), (seg2[2],seg2[3])
-    if A == C or A == D or B == C or B == D:
-        return False
-    return (ccw(A,C,D) != ccw(B,C,D)) and (ccw(A,B,C) != ccw(A,B,D))
+    def mobility(self, move):
+        return len(self.replies(move))
 
-def crosses_any(new_seg, all_segs):
-    for seg in all_segs:
-        if segments_cross(new_seg, seg):
-            return True
-    return False
+    def opp_mobility(self, move):
+        count = self._opp_mobility.get(move)
+        if count is None:
+            self.state.make_move(self.side, move)
+            count = len(self.state.legal_moves(1 - self.side))
+            self.state.unmake_move()
+            self._opp_mobility[move] = count
+        return count
 
-def knight_legal_moves(pos, visited, all_segs):
-    moves = []
-    for dr, dc in KNIGHT_MOVES:
-        nr, nc = pos[0]+dr, pos[1]+dc
-        if not is_valid_square(nr, nc):
-            continue
-        if (nr, nc) in visited:
-            continue
-        new_seg = (pos[0], pos[1], nr, nc)
-        if crosses_any(new_seg, all_segs):
-            continue
-        moves.append((nr, nc))
-    return moves
+    def lookahead3(self, move):
+        """Fewest onward moves after move and the worst second move."""
+        score = self._lookahead3.get(move)
+        if score is None:
+            replies = self.replies(move)
+            state, side = self.state, self.side
+            state.make_move(side, move)
+            score = lookahead_value(state, side, 2, self.table, moves=replies)
+            state.unmake_move()
+            self._lookahead3[move] = score
+        return score
+
+    def region(self, move):
+        """The mover's Voronoi squares minus the opponent's after move."""
+        score = self._region.get(move)
+        if score is None:
+            self.state.make_move(self.side, move)
+            score = region_score(self.state, self.side)
+            self.state.unmake_move()
+            self._region[move] = score
+        return score
 
 # --- Heuristics for metaheuristic ---
-def heuristic_max_mobility(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+# Each takes the shared DuelState and the side to move, and reads its move
+# evaluations from a DecisionCache (a fresh one when called on its own).
+def heuristic_max_mobility(state, side, rng, cache=None, **kwargs):
+    if cache is None:
+        cache = DecisionCache(state, side)
+    moves = cache.moves
     if not moves:
         return None
-    next_counts = [len(knight_legal_moves(m, visited | {m}, all_segs + [(pos[0], pos[1], m[0], m[1])])) for m in moves]
+    next_counts = [cache.mobility(m) for m in moves]
     max_count = max(next_counts)
     candidates = [m for m, cnt in zip(moves, next_counts) if cnt == max_count]
-    return random.choice(candidates)
+    return rng.choice(candidates)
 
-def heuristic_warnsdorff(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_warnsdorff(state, side, rng, cache=None, **kwargs):
+    if cache is None:
+        cache = DecisionCache(state, side)
+    moves = cache.moves
     if not moves:
         return None
-    next_counts = [len(knight_legal_moves(m, visited | {m}, all_segs + [(pos[0], pos[1], m[0], m[1])])) for m in moves]
+    next_counts = [cache.mobility(m) for m in moves]
     min_count = min(next_counts)
     candidates = [m for m, cnt in zip(moves, next_counts) if cnt == min_count]
-    return random.choice(candidates)
+    return rng.choice(candidates)
 
-def heuristic_blocking(pos, visited, all_segs, opp_pos=None, opp_visited=None, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_blocking(state, side, rng, cache=None, **kwargs):
+    if cache is None:
+        cache = DecisionCache(state, side)
+    moves = cache.moves
     if not moves:
         return None
-    opp_next_counts = []
-    for m in moves:
-        new_visited = visited | {m}
-        new_segs = all_segs + [(pos[0], pos[1], m[0], m[1])]
-        opp_moves = knight_legal_moves(opp_pos, opp_visited | new_visited, new_segs)
-        opp_next_counts.append(len(opp_moves))
+    opp_next_counts = [cache.opp_mobility(m) for m in moves]
     min_opp_count = min(opp_next_counts)
     candidates = [m for m, cnt in zip(moves, opp_next_counts) if cnt == min_opp_count]
-    return random.choice(candidates)
+    return rng.choice(candidates)
 
-def heuristic_center_control(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_center_control(state, side, rng, cache=None, **kwargs):
+    moves = cache.moves if cache is not None else state.legal_moves(side)
     if not moves:
         return None
     center = (3.5, 3.5)
     dists = [-(abs(m[0] - center[0]) + abs(m[1] - center[1])) for m in moves]
     max_dist = max(dists)
     candidates = [m for m, d in zip(moves, dists) if d == max_dist]
-    return random.choice(candidates)
+    return rng.choice(candidates)
 
-def heuristic_edge_avoidance(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_edge_avoidance(state, side, rng, cache=None, **kwargs):
+    moves = cache.moves if cache is not None else state.legal_moves(side)
     if not moves:
         return None
     edge_penalties = [min(m[0], BOARD_SIZE-1-m[0], m[1], BOARD_SIZE-1-m[1]) for m in moves]
     max_penalty = max(edge_penalties)
     candidates = [m for m, p in zip(moves, edge_penalties) if p == max_penalty]
-    return random.choice(candidates)
+    return rng.choice(candidates)
 
-def heuristic_lookahead3(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_lookahead3(state, side, rng, cache=None, **kwargs):
+    if cache is None:
+        cache = DecisionCache(state, side)
+    moves = cache.moves
     if not moves:
         return None
     best_move = moves[0]
     best_score = -1
     for m1 in moves:
-        v1 = visited | {m1}
-        s1 = all_segs + [(pos[0], pos[1], m1[0], m1[1])]
-        moves2 = knight_legal_moves(m1, v1, s1)
-        if not moves2:
-            score = 0
-        else:
-            min_third_ply = float('inf')
-            for m2 in moves2:
-                v2 = v1 | {m2}
-                s2 = s1 + [(m1[0], m1[1], m2[0], m2[1])]
-                moves3 = knight_legal_moves(m2, v2, s2)
-                third_ply_score = len(moves3)
-                if third_ply_score < min_third_ply:
-                    min_third_ply = third_ply_score
-            score = min_third_ply
+        score = cache.lookahead3(m1)
         if score > best_score:
             best_score = score
             best_move = m1
     return best_move
 
-def heuristic_mirror(pos, visited, all_segs, opp_pos=None, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_mirror(state, side, rng, cache=None, **kwargs):
+    if cache is None:
+        cache = DecisionCache(state, side)
+    moves = cache.moves
     if not moves:
         return None
     center = (3.5, 3.5)
+    opp_pos = state.pos(1 - side)
     opp_offset = (opp_pos[0] - center[0], opp_pos[1] - center[1])
     mirror_pos = (int(center[0] - opp_offset[0]), int(center[1] - opp_offset[1]))
     if mirror_pos in moves:
         return mirror_pos
-    return heuristic_max_mobility(pos, visited, all_segs)
+    return heuristic_max_mobility(state, side, rng, cache=cache)
 
-def heuristic_random(pos, visited, all_segs, **kwargs):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def heuristic_random(state, side, rng, cache=None, **kwargs):
+    moves = cache.moves if cache is not None else state.legal_moves(side)
     if not moves:
         return None
-    return random.choice(moves)
+    return rng.choice(moves)
 
 # --- Metaheuristic ---
-def metaheuristic(pos, visited, all_segs, opp_pos, opp_visited):
-    moves = knight_legal_moves(pos, visited, all_segs)
+def metaheuristic(state, side, rng, weights=DEFAULT_WEIGHTS, table=None):
+    # One cache per decision: the heuristics and the scoring below probe
+    # each move once between them
+    cache = DecisionCache(state, side, table)
+    moves = cache.moves
     if not moves:
         return None
+    opp = 1 - side
+    opp_pos = state.pos(opp)
 
     # Run all heuristics, collect unique candidate moves
     heuristics = [
@@ -160,7 +218,7 @@ def metaheuristic(pos, visited, all_segs, opp_pos, opp_visited):
     ]
     candidate_moves = set()
     for heuristic in heuristics:
-        move = heuristic(pos, visited, all_segs, opp_pos=opp_pos, opp_visited=opp_visited)
+        move = heuristic(state, side, rng, cache=cache)
         if move is not None and move in moves:
             candidate_moves.add(move)
 
@@ -168,22 +226,25 @@ def metaheuristic(pos, visited, all_segs, opp_pos, opp_visited):
     scored_moves = []
     for move in candidate_moves:
         # Mobility
-        own_future = len(knight_legal_moves(move, visited | {move}, all_segs + [(pos[0], pos[1], move[0], move[1])]))
+        own_future = cache.mobility(move)
         # Opponent restriction
-        opp_future = len(knight_legal_moves(opp_pos, opp_visited | visited | {move}, all_segs + [(pos[0], pos[1], move[0], move[1])]))
+        opp_future = cache.opp_mobility(move)
         # Center control
         center_score = -abs(move[0]-3.5) - abs(move[1]-3.5)
         # Edge avoidance
         edge_score = min(move[0], BOARD_SIZE-1-move[0], move[1], BOARD_SIZE-1-move[1])
         # Path parity (prefer moves that keep parity with Knight 1)
         parity_score = 1 if (move[0]+move[1])%2 == (opp_pos[0]+opp_pos[1])%2 else 0
-        # Combine weights (tuneable)
+        # Reachable regions (flood fills, skipped at weight 0)
+        region = cache.region(move) if weights["region"] else 0
+        # Combine weights (see DEFAULT_WEIGHTS)
         score = (
-            2.0*own_future
-            - 1.0*opp_future
-            + 0.5*center_score
-            + 0.5*edge_score
-            + 0.25*parity_score
+            weights["own_mobility"]*own_future
+            + weights["opp_mobility"]*opp_future
+            + weights["center"]*center_score
+            + weights["edge"]*edge_score
+            + weights["parity"]*parity_score
+            + weights["region"]*region
         )
         scored_moves.append((score, move))
 
@@ -191,54 +252,43 @@ def metaheuristic(pos, visited, all_segs, opp_pos, opp_visited):
     # Choose the move with the highest score; if tie, pick randomly among best
     max_score = scored_moves[0][0]
     best_moves = [move for score, move in scored_moves if score == max_score]
-    return random.choice(best_moves)
+    return rng.choice(best_moves)
 
-def duel_once(k1_start, k2_start):
-    k1_path = [k1_start]
-    k2_path = [k2_start]
-    k1_visited = set([k1_start])
-    k2_visited = set([k2_start])
+def duel_once(k1_start, k2_start, k1_rng, k2_rng, weights=DEFAULT_WEIGHTS):
+    state = DuelState(k1_start, k2_start, BOARD_SIZE, deltas=KNIGHT_MOVES)
     while True:
         made_move = False
         # Knight 1: max-mobility
-        pos1 = k1_path[-1]
-        all_segs = segments_from_path(k1_path) + segments_from_path(k2_path)
-        moves1 = knight_legal_moves(pos1, k1_visited | k2_visited, all_segs)
-        if moves1:
-            next_counts1 = [len(knight_legal_moves(m, k1_visited | k2_visited | {m}, all_segs + [(pos1[0], pos1[1], m[0], m[1])])) for m in moves1]
-            max_count1 = max(next_counts1)
-            candidates1 = [m for m, cnt in zip(moves1, next_counts1) if cnt == max_count1]
-            best_move1 = random.choice(candidates1)
-            k1_path.append(best_move1)
-            k1_visited.add(best_move1)
+        best_move1 = heuristic_max_mobility(state, 0, k1_rng)
+        if best_move1 is not None:
+            state.make_move(0, best_move1)
             made_move = True
         # Knight 2: metaheuristic
-        pos2 = k2_path[-1]
-        all_segs = segments_from_path(k1_path) + segments_from_path(k2_path)
-        moves2 = knight_legal_moves(pos2, k1_visited | k2_visited, all_segs)
-        if moves2:
-            best_move2 = metaheuristic(pos2, k1_visited | k2_visited, all_segs, opp_pos=k1_path[-1], opp_visited=k1_visited)
-            k2_path.append(best_move2)
-            k2_visited.add(best_move2)
+        best_move2 = metaheuristic(state, 1, k2_rng, weights)
+        if best_move2 is not None:
+            state.make_move(1, best_move2)
             made_move = True
         if not made_move:
             break
-    return len(k1_path), len(k2_path)
+    return len(state.paths[0]), len(state.paths[1])
+
+def run_trial(trial, seed, weights=DEFAULT_WEIGHTS):
+    # Separate streams for the start squares and for each knight's heuristic
+    rng = make_rng(seed, "starts")
+    while True:
+        k1_start = random_square(rng)
+        k2_start = random_square(rng)
+        if k1_start != k2_start:
+            break
+    k1_rng = make_rng(seed, "k1", heuristic_max_mobility.__name__)
+    k2_rng = make_rng(seed, "k2", metaheuristic.__name__)
+    return duel_once(k1_start, k2_start, k1_rng, k2_rng, weights)
 
-def main():
-    random.seed(32)
+def main(workers=None, weights=DEFAULT_WEIGHTS):
     TRIALS = 10000
-    results_k1 = []
-    results_k2 = []
-    for trial in range(TRIALS):
-        while True:
-            k1_start = random_square()
-            k2_start = random_square()
-            if k1_start != k2_start:
-                break
-        k1len, k2len = duel_once(k1_start, k2_start)
-        results_k1.append(k1len)
-        results_k2.append(k2len)
+    outcomes = run_trials(partial(run_trial, weights=weights), TRIALS, seed=32, experiment="noncrossing_metaheuristic", workers=workers)
+    results_k1 = [k1len for k1len, _ in outcomes.elements()]
+    results_k2 = [k2len for _, k2len in outcomes.elements()]
     from collections import Counter
     hist_k1 = Counter(results_k1)
     hist_k2 = Counter(results_k2)
@@ -263,4 +313,8 @@ def main():
     print(f"Draw%:        {100.0*draws/TRIALS:.2f}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Metaheuristic Knight 2 against a max-mobility Knight 1.")
+    parser.add_argument("--weights", help="JSON weights file, e.g. from metaheuristic_tuning.py")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.workers, load_weights(args.weights) if args.weights else DEFAULT_WEIGHTS)
\ No newline at end of file
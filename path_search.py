@@ -0,0 +1,158 @@
+"""Exact-length simple knight paths with pruning.
+
+find_exact_path looks for a path of exactly x moves from start to end that
+never revisits a square. Besides the depth cut-off of the old backtracking
+helpers, a branch is dropped as soon as it cannot be completed:
+
+- distance: the knight distance to end (ignoring visited squares) is more
+  than the moves left;
+- parity: a knight changes square colour every move, so x must match the
+  colours of start and end;
+- reachability: end is not in the region of unvisited squares reachable
+  from the knight, or that region holds too few squares of either colour
+  for the moves left;
+- dead ends: a next square with no unvisited exit while moves remain.
+
+The search keeps an explicit stack rather than recursing: the path, the
+visited mask after each move and the candidate moves of each depth live in
+arrays allocated once for the whole search, so paths of thousands of moves
+need no recursion limit tuning. Squares and the visited set are
+knight_board indices and bitmasks.
+"""
+
+from collections import deque
+
+from knight_board import get_board
+
+MAZE_NODE_BUDGET = 20000  # per attempt in the maze generators, which retry on failure
+
+def _distances_to(board, target, blocked=0):
+    dist = [-1] * board.size
+    dist[target] = 0
+    queue = deque([target])
+    bits = board.bits
+    while queue:
+        sq = queue.popleft()
+        for t in board.neighbours[sq]:
+            if dist[t] == -1 and not blocked & bits[t]:
+                dist[t] = dist[sq] + 1
+                queue.append(t)
+    return dist
+
+def _colour_masks(board):
+    masks = [0, 0]
+    for i, (r, c) in enumerate(board.coords):
+        masks[(r + c) & 1] |= 1 << i
+    return masks
+
+def find_exact_path(m, n, start, end, x, rng=None, node_budget=None, entry_square=None, warnsdorff=False):
+    """Simple path of exactly x knight moves from start to end, or None.
+
+    With rng (anything with a shuffle method, e.g. the random module) the
+    moves at each square are tried in random order, otherwise in
+    KNIGHT_MOVES order. warnsdorff tries squares with the fewest onward
+    moves first (ties keep that order), which is what finds very long,
+    near-Hamiltonian paths. entry_square forces the last move to come from
+    that square. node_budget caps the number of squares expanded; when it
+    runs out the search gives up and returns None.
+    """
+    board = get_board(m, n)
+    if entry_square is None:
+        path = _search(board, start, end, x, 0, rng, node_budget, warnsdorff)
+    elif entry_square in board.neighbour_coords[end]:
+        # Reach the entry square in x - 1 moves without touching end first
+        path = _search(board, start, entry_square, x - 1, board.bit[end], rng, node_budget, warnsdorff)
+        if path is not None:
+            path.append(end)
+    else:
+        path = None
+    return path
+
+def _search(board, start, end, x, blocked, rng, node_budget, warnsdorff):
+    if x < 0 or blocked & board.bit[start]:
+        return None
+    s, e = board.index[start], board.index[end]
+    if x == 0:
+        return [start] if s == e else None
+    if s == e or (start[0] + start[1] + end[0] + end[1] + x) % 2:
+        return None
+    dist = _distances_to(board, e, blocked)
+    if dist[s] == -1 or dist[s] > x:
+        return None
+
+    neighbours = board.neighbours
+    attacks = board.attacks
+    attacks_of_set = board.attacks_of_set
+    bits = board.bits
+    full = board.full
+    end_bit = bits[e]
+    colours = _colour_masks(board)
+    square_colour = [(r + c) & 1 for r, c in board.coords]
+
+    # Per-depth state: square, visited mask, candidate moves and the next
+    # candidate to try.
+    path = [0] * (x + 1)
+    visited_at = [0] * (x + 1)
+    options = [()] * (x + 1)
+    cursor = [0] * (x + 1)
+    expanded = 0
+
+    def expand(depth):
+        # Candidate next squares from path[depth] with x - depth moves left
+        sq = path[depth]
+        visited = visited_at[depth]
+        remaining = x - depth
+        if remaining == 1:
+            return (e,) if attacks[sq] & end_bit else ()
+
+        free = full & ~visited
+        region = 0
+        frontier = attacks[sq] & free
+        while frontier:
+            region |= frontier
+            frontier = attacks_of_set(frontier) & free & ~region
+        if not region & end_bit:
+            return ()
+        # The remaining squares alternate colours, starting opposite to sq
+        colour = square_colour[sq]
+        if ((region & colours[colour ^ 1]).bit_count() < (remaining + 1) // 2
+                or (region & colours[colour]).bit_count() < remaining // 2):
+            return ()
+
+        left = remaining - 1
+        exits_needed = free & ~end_bit
+        candidates = [
+            t for t in neighbours[sq]
+            if not visited & bits[t] and t != e and 0 < dist[t] <= left
+            and (left == 1 or attacks[t] & exits_needed)
+        ]
+        if rng is not None:
+            rng.shuffle(candidates)
+        if warnsdorff:
+            candidates.sort(key=lambda t: (attacks[t] & exits_needed).bit_count())
+        return candidates
+
+    path[0] = s
+    visited_at[0] = bits[s] | blocked
+    options[0] = expand(0)
+    cursor[0] = 0
+    depth = 0
+    while depth >= 0:
+        i = cursor[depth]
+        if i == len(options[depth]):
+            depth -= 1
+            continue
+        cursor[depth] = i + 1
+        t = options[depth][i]
+        depth += 1
+        path[depth] = t
+        if depth == x:
+            coords = board.coords
+            return [coords[sq] for sq in path]
+        expanded += 1
+        if node_budget is not None and expanded > node_budget:
+            return None
+        visited_at[depth] = visited_at[depth - 1] | bits[t]
+        options[depth] = expand(depth)
+        cursor[depth] = 0
+    return None
@@ -0,0 +1,112 @@
+"""Reachable regions and their Voronoi split as an evaluation term.
+
+A knight's region is the set of unvisited squares it could still reach
+through unblocked segments, ignoring what its own later segments would
+block. It bounds how many moves the knight has left. The Voronoi split
+gives every square of the two regions to the knight that reaches it in
+fewer moves; squares at equal distance are contested. Once the regions
+are separated, each knight owns its whole region and the longer region
+usually wins.
+
+region_score(state, side) is side's Voronoi squares minus the opponent's.
+The split is one breadth-first search from both knights at once through the
+free squares, one layer per step, so scoring a position costs about two
+floods whether or not the regions have separated.
+
+Nothing is cached through make/unmake. Deriving a position's regions from
+its parent's saves a flood only some of the time. The callers also never
+score a parent before its children: the move scorings score single moves,
+and alpha-beta scores only its leaves. Scoring the parents first cost more
+than it saved. The callers:
+
+    noncrossing_metaheuristic   the "region" weight
+    lookahead_3ply              heuristic_lookahead3(region_weight=...)
+    alphabeta                   the "region" evaluation
+
+Against max-mobility in the non-crossing game, the first two lift Knight 2
+from about a third of the wins to about two thirds.
+"""
+
+class _Geometry:
+    """Move lists by square index, for floods that respect drawn segments."""
+
+    def __init__(self, board, edges):
+        self.board = board
+        self.edges = edges
+        if edges is not None:
+            # (target bit, edge bit) by square index, and the union of the edge bits
+            self.moves = [tuple((board.bit[t], edge_bit) for t, edge_bit in edges.moves[a]) for a in board.coords]
+            self.move_edges = [sum(edge_bit for _, edge_bit in moves) for moves in self.moves]
+
+    def expand(self, frontier, allowed, blocked):
+        """Squares in allowed one move from frontier through unblocked segments."""
+        if self.edges is None:
+            return self.board.attacks_of_set(frontier) & allowed
+        attacks, moves, move_edges = self.board.attacks, self.moves, self.move_edges
+        result = 0
+        while frontier:
+            low = frontier & -frontier
+            i = low.bit_length() - 1
+            targets = attacks[i] & allowed & ~result
+            if targets:
+                if blocked & move_edges[i]:
+                    for t_bit, edge_bit in moves[i]:
+                        if targets & t_bit and not blocked & edge_bit:
+                            result |= t_bit
+                else:
+                    result |= targets
+            frontier ^= low
+        return result
+
+    def flood(self, start_bit, allowed, blocked):
+        region = 0
+        frontier = self.expand(start_bit, allowed, blocked)
+        while frontier:
+            region |= frontier
+            frontier = self.expand(frontier, allowed & ~region, blocked)
+        return region
+
+    def voronoi(self, start_bits, allowed, blocked):
+        """(squares 0 reaches first, squares 1 reaches first, contested)."""
+        own = [0, 0]
+        contested = 0
+        claimed = 0
+        frontiers = [self.expand(start_bits[s], allowed, blocked) for s in (0, 1)]
+        seen = list(frontiers)
+        while frontiers[0] or frontiers[1]:
+            new0 = frontiers[0] & ~claimed
+            new1 = frontiers[1] & ~claimed
+            own[0] |= new0 & ~new1
+            own[1] |= new1 & ~new0
+            contested |= new0 & new1
+            claimed |= new0 | new1
+            for s in (0, 1):
+                frontiers[s] = self.expand(frontiers[s], allowed & ~seen[s], blocked)
+                seen[s] |= frontiers[s]
+        return own[0], own[1], contested
+
+_GEOMETRY = {}
+
+def _geometry(state):
+    geometry = _GEOMETRY.get((state.board, state.edges))
+    if geometry is None:
+        geometry = _GEOMETRY[(state.board, state.edges)] = _Geometry(state.board, state.edges)
+    return geometry
+
+def regions(state):
+    """Both knights' reachable unvisited squares, as masks."""
+    geometry = _geometry(state)
+    allowed = state.board.full & ~state.visited
+    bit = state.board.bit
+    return tuple(geometry.flood(bit[state.pos(s)], allowed, state.blocked) for s in (0, 1))
+
+def voronoi(state):
+    """(squares knight 0 reaches first, squares knight 1 reaches first, contested)."""
+    bit = state.board.bit
+    return _geometry(state).voronoi((bit[state.pos(0)], bit[state.pos(1)]), state.board.full & ~state.visited,
+                                    state.blocked)
+
+def region_score(state, side):
+    """side's Voronoi squares minus the opponent's."""
+    split = voronoi(state)
+    return bin(split[side]).count("1") - bin(split[1 - side]).count("1")
@@ -0,0 +1,94 @@
+"""Shortest-path DAG analysis for knight moves.
+
+One BFS from the start and one from the end give, for every square v,
+D(start, v), D(v, end) and the number of shortest paths on each side. v lies
+on a shortest path exactly when D(start, v) + D(v, end) == D(start, end), and
+the paths through it number forward[v] * backward[v]. Everything is linear in
+the board size instead of enumerating the paths one by one.
+"""
+
+from collections import deque
+
+from knight_board import get_board
+
+def _bfs_counts(board, source, blocked):
+    dist = [-1] * board.size
+    count = [0] * board.size
+    dist[source] = 0
+    count[source] = 1
+    queue = deque([source])
+    neighbours = board.neighbours
+    bits = board.bits
+    while queue:
+        sq = queue.popleft()
+        d = dist[sq] + 1
+        for t in neighbours[sq]:
+            if blocked & bits[t]:
+                continue
+            if dist[t] == -1:
+                dist[t] = d
+                count[t] = count[sq]
+                queue.append(t)
+            elif dist[t] == d:
+                count[t] += count[sq]
+    return dist, count
+
+class ShortestPathDAG:
+    """All shortest knight paths from start to end on an m x n board.
+
+    length is -1 (and num_paths 0) when end cannot be reached. blocked is an
+    optional iterable of (row, col) squares the knight may not enter.
+    """
+
+    def __init__(self, m, n, start, end, blocked=()):
+        board = get_board(m, n)
+        self.board = board
+        self.start = start
+        self.end = end
+        blocked_mask = board.mask_of(blocked) & ~(board.bit[start] | board.bit[end])
+        self.dist_from_start, self.paths_from_start = _bfs_counts(board, board.index[start], blocked_mask)
+        self.dist_to_end, self.paths_to_end = _bfs_counts(board, board.index[end], blocked_mask)
+        self.length = self.dist_from_start[board.index[end]]
+        self.num_paths = self.paths_from_start[board.index[end]]
+
+        # Squares on some shortest path, in index order
+        self._on_path = []
+        if self.length != -1:
+            for sq in range(board.size):
+                df = self.dist_from_start[sq]
+                if df != -1 and df + self.dist_to_end[sq] == self.length:
+                    self._on_path.append(sq)
+
+    @property
+    def squares(self):
+        """Set of (row, col) squares on at least one shortest path."""
+        coords = self.board.coords
+        return {coords[sq] for sq in self._on_path}
+
+    def layers(self):
+        """Squares of the DAG grouped by distance from start."""
+        layers = [[] for _ in range(self.length + 1)]
+        coords = self.board.coords
+        for sq in self._on_path:
+            layers[self.dist_from_start[sq]].append(coords[sq])
+        return layers
+
+    def through(self):
+        """(row, col) -> number of shortest paths visiting that square."""
+        coords = self.board.coords
+        return {coords[sq]: self.paths_from_start[sq] * self.paths_to_end[sq] for sq in self._on_path}
+
+    def edge_usage(self):
+        """((row, col), (row, col)) -> number of shortest paths using that move."""
+        usage = {}
+        coords = self.board.coords
+        for sq in self._on_path:
+            d = self.dist_from_start[sq] + 1
+            for t in self.board.neighbours[sq]:
+                if self.dist_from_start[t] == d and d + self.dist_to_end[t] == self.length:
+                    usage[(coords[sq], coords[t])] = self.paths_from_start[sq] * self.paths_to_end[t]
+        return usage
+
+    def bottlenecks(self):
+        """Squares every shortest path passes through, start and end included."""
+        return sorted(sq for sq, count in self.through().items() if count == self.num_paths)
@@ -1,32 +1,23 @@
-import random
 import math
 from collections import defaultdict
 
+from knight_board import get_board
+from trial_runner import make_rng, run_trials
+
 # --- Configuration ---
 TIE_STRATEGY = 'min_degree'
 NUM_SIMULATIONS = 10000
 
 # --- Build Knight Graph ---
 def build_knight_adjacency(n=8):
-    deltas = [(2,1),(1,2),(-1,2),(-2,1),(-2,-1),(-1,-2),(1,-2),(2,-1)]
-    adj = {}
-    for r in range(n):
-        for c in range(n):
-            nbrs = {
-                (r+dr, c+dc)
-                for dr, dc in deltas
-                if 0 <= r+dr < n and 0 <= c+dc < n
-            }
-            adj[(r, c)] = nbrs
-    return adj
+    # Squares are bitboard indices (r * n + c); visited sets are int masks
+    return get_board(n, n)
 
 # --- Warnsdorff Candidate Generator ---
 def get_warnsdorff_moves(pos, visited, adj):
     candidates = []
-    for nbr in adj[pos]:
-        if nbr in visited:
-            continue
-        deg = sum(1 for nn in adj[nbr] if nn not in visited)
+    for nbr in adj.legal_moves(pos, visited):
+        deg = adj.mobility(nbr, visited)
         candidates.append((deg, nbr))
     if not candidates:
         return []
@@ -39,78 +30,72 @@ freq_counter = defaultdict(int)
 def build_weight_map(adj):
     weight = {}
     center = ( (7)/2, (7)/2 )
-    for sq in adj:
-        d = math.hypot(sq[0] - center[0], sq[1] - center[1])
+    for sq, (r, c) in enumerate(adj.coords):
+        d = math.hypot(r - center[0], c - center[1])
         weight[sq] = 1.0 / (d + 1.0)
     return weight
 
 WEIGHT_MAP = None
 
-def tiebreak_random(cands, visited, adj):
-    return random.choice(cands)
+def tiebreak_random(cands, visited, adj, rng):
+    return rng.choice(cands)
 
-def tiebreak_min_degree(cands, visited, adj):
+def tiebreak_min_degree(cands, visited, adj, rng):
     deg2 = {}
     for s in cands:
-        vis2 = visited | {s}
-        nbrs = [n for n in adj[s] if n not in vis2]
+        vis2 = visited | adj.bits[s]
+        nbrs = adj.legal_moves(s, vis2)
         if not nbrs:
             deg2[s] = 0
         else:
-            deg2[s] = min(
-                sum(1 for nn in adj[n] if nn not in vis2)
-                for n in nbrs
-            )
+            deg2[s] = min(adj.mobility(n, vis2) for n in nbrs)
     best = [s for s, d in deg2.items() if d == min(deg2.values())]
-    return random.choice(best)
+    return rng.choice(best)
 
-def tiebreak_max_degree(cands, visited, adj):
+def tiebreak_max_degree(cands, visited, adj, rng):
     deg2 = {}
     for s in cands:
-        vis2 = visited | {s}
-        nbrs = [n for n in adj[s] if n not in vis2]
+        vis2 = visited | adj.bits[s]
+        nbrs = adj.legal_moves(s, vis2)
         if not nbrs:
             deg2[s] = 0
         else:
-            deg2[s] = max(
-                sum(1 for nn in adj[n] if nn not in vis2)
-                for n in nbrs
-            )
+            deg2[s] = max(adj.mobility(n, vis2) for n in nbrs)
     best = [s for s, d in deg2.items() if d == max(deg2.values())]
-    return random.choice(best)
+    return rng.choice(best)
 
-def tiebreak_center(cands, visited, adj):
+def tiebreak_center(cands, visited, adj, rng):
     dmap = {
-        s: max(abs(s[0] - 3.5), abs(s[1] - 3.5))
+        s: max(abs(adj.coords[s][0] - 3.5), abs(adj.coords[s][1] - 3.5))
         for s in cands
     }
     best = [s for s, d in dmap.items() if d == min(dmap.values())]
-    return random.choice(best)
+    return rng.choice(best)
 
-def tiebreak_edge(cands, visited, adj):
+def tiebreak_edge(cands, visited, adj, rng):
     dmap = {
-        s: max(abs(s[0] - 3.5), abs(s[1] - 3.5))
+        s: max(abs(adj.coords[s][0] - 3.5), abs(adj.coords[s][1] - 3.5))
         for s in cands
     }
     best = [s for s, d in dmap.items() if d == max(dmap.values())]
-    return random.choice(best)
+    return rng.choice(best)
 
-def tiebreak_lex(cands, visited, adj):
+def tiebreak_lex(cands, visited, adj, rng):
     return sorted(cands)[0]
 
-def tiebreak_freq(cands, visited, adj):
+def tiebreak_freq(cands, visited, adj, rng):
     freqs = {s: freq_counter[s] for s in cands}
     best = [s for s, f in freqs.items() if f == min(freqs.values())]
-    choice = random.choice(best)
+    choice = rng.choice(best)
     freq_counter[choice] += 1
     return choice
 
-def tiebreak_weighted(cands, visited, adj):
+def tiebreak_weighted(cands, visited, adj, rng):
     global WEIGHT_MAP
     if WEIGHT_MAP is None:
         WEIGHT_MAP = build_weight_map(adj)
     weights = [WEIGHT_MAP[s] for s in cands]
-    return random.choices(cands, weights=weights, k=1)[0]
+    return rng.choices(cands, weights=weights, k=1)[0]
 
 TIE_FUNCS = {
     'random': tiebreak_random,
@@ -123,15 +108,15 @@ TIE_FUNCS = {
     'weighted': tiebreak_weighted
 }
 
-def select_warnsdorff(pos, visited, adj):
+def select_warnsdorff(pos, visited, adj, rng):
     cands = get_warnsdorff_moves(pos, visited, adj)
     if not cands:
         return None
     if len(cands) == 1:
         return cands[0]
-    return TIE_FUNCS[TIE_STRATEGY](cands, visited, adj)
+    return TIE_FUNCS[TIE_STRATEGY](cands, visited, adj, rng)
 
-def choose_3ply(pos, opp_pos, visited, adj):
+def choose_3ply(pos, opp_pos, visited, adj, rng):
     S1 = get_warnsdorff_moves(pos, visited, adj)
     if not S1:
         return None
@@ -140,12 +125,12 @@ def choose_3ply(pos, opp_pos, visited, adj):
     best_moves = []
 
     for s1 in S1:
-        vis1 = visited | {s1}
-        s2 = select_warnsdorff(opp_pos, vis1, adj)
-        vis2 = vis1 | {s2} if s2 else vis1
-        s3 = select_warnsdorff(s1, vis2, adj)
-        if s3:
-            deg3 = sum(1 for n in adj[s3] if n not in vis2)
+        vis1 = visited | adj.bits[s1]
+        s2 = select_warnsdorff(opp_pos, vis1, adj, rng)
+        vis2 = vis1 | adj.bits[s2] if s2 is not None else vis1
+        s3 = select_warnsdorff(s1, vis2, adj, rng)
+        if s3 is not None:
+            deg3 = adj.mobility(s3, vis2)
         else:
             deg3 = 0
 
@@ -157,28 +142,29 @@ def choose_3ply(pos, opp_pos, visited, adj):
 
     if len(best_moves) == 1:
         return best_moves[0]
-    return TIE_FUNCS[TIE_STRATEGY](best_moves, visited, adj)
+    return TIE_FUNCS[TIE_STRATEGY](best_moves, visited, adj, rng)
 
-def simulate_two_knights(adj, start1, start2):
-    visited = {start1, start2}
+def simulate_two_knights(adj, start1, start2, rng1, rng2, choose1=choose_3ply, choose2=choose_3ply):
+    # choose1/choose2 take choose_3ply's arguments, e.g. alphabeta.AlphaBeta.choose_index
+    visited = adj.bits[start1] | adj.bits[start2]
     seq1, seq2 = [start1], [start2]
     turn, stuck1, stuck2 = 1, False, False
 
     while True:
         if turn == 1:
-            mv = choose_3ply(seq1[-1], seq2[-1], visited, adj)
-            if mv:
+            mv = choose1(seq1[-1], seq2[-1], visited, adj, rng1)
+            if mv is not None:
                 seq1.append(mv)
-                visited.add(mv)
+                visited |= adj.bits[mv]
                 stuck1 = False
             else:
                 stuck1 = True
             turn = 2
         else:
-            mv = choose_3ply(seq2[-1], seq1[-1], visited, adj)
-            if mv:
+            mv = choose2(seq2[-1], seq1[-1], visited, adj, rng2)
+            if mv is not None:
                 seq2.append(mv)
-                visited.add(mv)
+                visited |= adj.bits[mv]
                 stuck2 = False
             else:
                 stuck2 = True
@@ -221,11 +207,24 @@ def print_results_table(stats1, stats2):
         print("{:<7} {:<10.3f} {:<14.2f} {:<10.3f} {:<14.2f}".format(
             res.capitalize(), r1, m1, r2, m2))
 
-if __name__ == "__main__":
-    random.seed()
+def run_trial(trial, seed):
+    global WEIGHT_MAP
+    # Reset tiebreak freq
+    freq_counter.clear()
+    WEIGHT_MAP = None
     adjacency = build_knight_adjacency(8)
-    squares = list(adjacency.keys())
+    squares = list(range(adjacency.size))
+    # Random distinct starts, then one stream per knight's move choices
+    rng = make_rng(seed, "starts")
+    start1 = rng.choice(squares)
+    start2 = rng.choice([s for s in squares if s != start1])
+    rng1 = make_rng(seed, "k1", TIE_STRATEGY)
+    rng2 = make_rng(seed, "k2", TIE_STRATEGY)
+    seq1, seq2 = simulate_two_knights(adjacency, start1, start2, rng1, rng2)
+    res1, res2 = determine_result(seq1, seq2)
+    return res1, res2, len(seq1)-1, len(seq2)-1
 
+if __name__ == "__main__":
     stats1 = {'win': {'count': 0, 'moves': 0},
               'loss': {'count': 0, 'moves': 0},
               'draw': {'count': 0, 'moves': 0}}
@@ -233,16 +232,10 @@ if __name__ == "__main__":
               'loss': {'count': 0, 'moves': 0},
               'draw': {'count': 0, 'moves': 0}}
 
-    for _ in range(NUM_SIMULATIONS):
-        # Reset tiebreak freq
-        freq_counter.clear()
-        WEIGHT_MAP = None
-        # Random distinct starts
-        start1 = random.choice(squares)
-        start2 = random.choice([s for s in squares if s != start1])
-        seq1, seq2 = simulate_two_knights(adjacency, start1, start2)
-        res1, res2 = determine_result(seq1, seq2)
-        update_stats(stats1, res1, len(seq1)-1)
-        update_stats(stats2, res2, len(seq2)-1)
+    # No fixed seed: every run draws a fresh master seed
+    outcomes = run_trials(run_trial, NUM_SIMULATIONS, experiment="trap_sim_v1")
+    for res1, res2, moves1, moves2 in outcomes.elements():
+        update_stats(stats1, res1, moves1)
+        update_stats(stats2, res2, moves2)
 
     print_results_table(stats1, stats2)
\ No newline at end of file
@@ -0,0 +1,321 @@
+"""Exact solver for the two-knight longest-path game on small boards.
+
+Two knights move in turn and may not enter a visited square; a knight with
+no move passes, and the game ends when neither can move. The knight that
+made more moves wins (trap_sim_v1 is this game; with non_crossing=True a
+move may also not cross a drawn segment, the game of lookahead_3ply and
+noncrossing_metaheuristic).
+
+The value of a position is the margin the side to move can force: its
+remaining moves minus the opponent's, both playing to maximise their own
+margin. It depends only on the visited squares, the blocked edges and the
+two knight squares, which form the transposition table key (the mover's
+square first, so positions with the sides swapped share entries). The
+search is negamax with alpha-beta and fail-soft bounds in the table; moves
+are tried table move first, then by Warnsdorff degree (fewest onward moves
+first). solve() runs iterative deepening: depth-limited iterations scored
+by mobility difference fill the move-ordering table, and the first
+iteration that never reaches its depth limit is exact. outcome() only
+proves the sign (win/draw/loss) with a narrow window, which is much cheaper.
+
+The squares the side to move can still reach bound the value from above
+and cut nodes that cannot matter. In the plain game, once the two regions
+separate the knights no longer interact and the value is the difference
+of two single-knight longest paths, solved with their own table.
+
+The table is kept between calls, so labelling many positions on one board
+reuses earlier work.
+
+    python trap_solver.py label --size 5 --positions 1000 --plies 2 > labels.jsonl
+    python trap_solver.py grade --size 6 --positions 300 --plies 5
+    python trap_solver.py grade --size 8 --positions 100 --plies 8 --non-crossing
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from crossing_table import get_crossing_table
+from duel_state import DuelState
+from knight_board import get_board
+
+EXACT, LOWER, UPPER = 0, 1, 2
+TABLE_LIMIT = 4_000_000  # entries before the transposition table is cleared
+
+class TrapSolver:
+    def __init__(self, m, n=None, non_crossing=False):
+        board = get_board(m, n)
+        self.board = board
+        self.non_crossing = non_crossing
+        bits = board.bits
+        # Per square index: (target, target bit, edge bit, blocked edges after the move)
+        if non_crossing:
+            edges = get_crossing_table(m, n)
+            self.moves = [
+                tuple((board.index[t], bits[board.index[t]], edge_bit, edges.crossing[(a, t)])
+                      for t, edge_bit in edges.moves[a])
+                for a in board.coords
+            ]
+        else:
+            self.moves = [tuple((t, bits[t], 0, 0) for t in board.neighbours[a]) for a in range(board.size)]
+        self._square_colour = [(r + c) & 1 for r, c in board.coords]
+        self._colour_masks = [0, 0]
+        for i, colour in enumerate(self._square_colour):
+            self._colour_masks[colour] |= bits[i]
+        self.table = {}
+        self.longest_table = {}
+        self.best_move = {}
+        self.nodes = 0
+        self._horizon_hit = False
+
+    def clear(self):
+        self.table.clear()
+        self.longest_table.clear()
+        self.best_move.clear()
+
+    def _reach(self, visited, sq):
+        """Free squares a knight on sq could ever reach, ignoring crossings."""
+        return self._flood(self.board.full & ~visited, sq)
+
+    def _flood(self, free, sq):
+        board = self.board
+        region = 0
+        frontier = board.attacks[sq] & free
+        while frontier:
+            region |= frontier
+            frontier = board.attacks_of_set(frontier) & free & ~region
+        return region
+
+    def longest(self, visited, sq):
+        """Most moves a lone knight on sq can still make (plain game only)."""
+        return self._longest(self._reach(visited, sq), sq)
+
+    def _longest(self, region, sq):
+        # region: the free squares the knight might still use
+        key = (region, sq)
+        best = self.longest_table.get(key)
+        if best is None:
+            best = 0
+            # Moves alternate square colours, starting with the opposite one
+            opposite = self._colour_masks[self._square_colour[sq] ^ 1]
+            n_opposite = bin(region & opposite).count("1")
+            n_same = bin(region & ~opposite).count("1")
+            bound = min(2 * n_opposite, 2 * n_same + 1)
+            bits = self.board.bits
+            attacks = self.board.attacks
+            # Warnsdorff order finds a path meeting the bound early
+            options = sorted((bin(attacks[t] & region).count("1"), t)
+                             for t in self.board.neighbours[sq] if region & bits[t])
+            for _, t in options:
+                best = max(best, 1 + self._longest(self._flood(region & ~bits[t], t), t))
+                if best >= bound:
+                    break
+            self.longest_table[key] = best
+        return best
+
+    def legal(self, visited, blocked, sq):
+        """Moves from square index sq as (target, target bit, edge bit, conflicts)."""
+        return [mv for mv in self.moves[sq] if not (visited & mv[1] or blocked & mv[2])]
+
+    def _ordered(self, visited, blocked, moves, key):
+        best = self.best_move.get(key)
+        def degree(mv):
+            after = visited | mv[1]
+            blocked_after = blocked | mv[3]
+            return sum(1 for nxt in self.moves[mv[0]] if not (after & nxt[1] or blocked_after & nxt[2]))
+        moves.sort(key=lambda mv: (mv[0] != best, degree(mv)))
+        return moves
+
+    def _search(self, visited, blocked, mover, other, alpha, beta, depth, table):
+        self.nodes += 1
+        key = (visited, blocked, mover, other)
+        entry = table.get(key)
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                return value
+        # The squares the mover could still reach bound its margin; in the
+        # plain game, once no reachable square touches the other knight the
+        # two play independently
+        reach = self._reach(visited, mover)
+        if not self.non_crossing and not reach & self.board.attacks[other] & ~visited:
+            value = self._longest(reach, mover) - self.longest(visited, other)
+            table[key] = (value, EXACT)
+            return value
+        high = bin(reach).count("1")
+        if high <= alpha:
+            return high
+        moves = self.legal(visited, blocked, mover)
+        if not moves:
+            if not self.legal(visited, blocked, other):
+                table[key] = (0, EXACT)
+                return 0
+            # Pass: a stuck knight stays stuck, so this costs no depth
+            value = -self._search(visited, blocked, other, mover, -beta, -alpha, depth, table)
+        elif depth == 0:
+            self._horizon_hit = True
+            return len(moves) - len(self.legal(visited, blocked, other))
+        else:
+            value = -len(self.board.coords)
+            a = alpha
+            for mv in self._ordered(visited, blocked, moves, key):
+                child = 1 - self._search(visited | mv[1], blocked | mv[3], other, mv[0],
+                                         1 - beta, 1 - a, None if depth is None else depth - 1, table)
+                if child > value:
+                    value = child
+                    self.best_move[key] = mv[0]
+                    if value > a:
+                        a = value
+                        if a >= beta:
+                            break
+        if value <= alpha:
+            table[key] = (value, UPPER)
+        elif value >= beta:
+            table[key] = (value, LOWER)
+        else:
+            table[key] = (value, EXACT)
+        return value
+
+    def solve(self, visited, blocked, mover, other, alpha=None, beta=None):
+        """Exact margin for the side to move (squares are board indices)."""
+        if alpha is None:
+            alpha, beta = -self.board.size, self.board.size
+        if len(self.table) > TABLE_LIMIT:
+            self.clear()
+        entry = self.table.get((visited, blocked, mover, other))
+        if entry is not None:
+            value, flag = entry
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                return value
+        depth = 2
+        free = self.board.size - bin(visited).count("1")
+        while depth < free:
+            self._horizon_hit = False
+            table = {}
+            value = self._search(visited, blocked, mover, other, alpha, beta, depth, table)
+            if not self._horizon_hit:
+                # No entry of this iteration depends on the depth limit, so
+                # keep them; an exact value is never replaced by a bound
+                stored = self.table
+                for key, entry in table.items():
+                    if entry[1] == EXACT or key not in stored:
+                        stored[key] = entry
+                return value
+            depth *= 2
+        return self._search(visited, blocked, mover, other, alpha, beta, None, self.table)
+
+    def outcome(self, visited, blocked, mover, other):
+        """1, 0 or -1: whether the side to move wins, draws or loses."""
+        value = self._search(visited, blocked, mover, other, -1, 1, None, self.table)
+        return max(-1, min(1, value))
+
+    def move_values(self, visited, blocked, mover, other):
+        """Exact margin after each legal move: {target index: value for the mover}."""
+        return {
+            mv[0]: 1 - self.solve(visited | mv[1], blocked | mv[3], other, mv[0])
+            for mv in self.legal(visited, blocked, mover)
+        }
+
+    def position(self, state, side):
+        """(visited, blocked, mover, other) for a DuelState with side to move."""
+        index = self.board.index
+        return state.visited, state.blocked, index[state.pos(side)], index[state.pos(1 - side)]
+
+# --- Labelling and grading ---
+
+def random_position(size, plies, rng, non_crossing=False):
+    """DuelState after up to plies random moves per side; side 0 to move."""
+    squares = [(r, c) for r in range(size) for c in range(size)]
+    k1_start, k2_start = rng.sample(squares, 2)
+    state = DuelState(k1_start, k2_start, size, non_crossing=non_crossing)
+    for _ in range(plies):
+        for side in (0, 1):
+            moves = state.legal_moves(side)
+            if moves:
+                state.make_move(side, rng.choice(moves))
+    return state
+
+def _choose_3ply(state, side, rng):
+    import trap_sim_v1
+    board = get_board(state.board.m, state.board.n)
+    move = trap_sim_v1.choose_3ply(board.index[state.pos(side)], board.index[state.pos(1 - side)],
+                                   state.visited, board, rng)
+    return None if move is None else board.coords[move]
+
+def _metaheuristic(state, side, rng):
+    from noncrossing_metaheuristic import metaheuristic
+    return metaheuristic(state, side, rng)
+
+PLAYERS = {"choose_3ply": _choose_3ply, "metaheuristic": _metaheuristic}
+
+def label(size, positions, plies, seed=0, non_crossing=False):
+    solver = TrapSolver(size, non_crossing=non_crossing)
+    rng = random.Random(seed)
+    for _ in range(positions):
+        state = random_position(size, plies, rng, non_crossing)
+        key = solver.position(state, 0)
+        values = solver.move_values(*key)
+        coords = solver.board.coords
+        yield {
+            "size": size,
+            "non_crossing": non_crossing,
+            "paths": [list(map(list, state.paths[0])), list(map(list, state.paths[1]))],
+            "to_move": 0,
+            "value": max(values.values()) if values else solver.solve(*key),
+            "move_values": {f"{coords[t][0]},{coords[t][1]}": v for t, v in values.items()},
+        }
+
+def grade(size, positions, plies, players, seed=0, non_crossing=False):
+    """How often each player picks an optimal move, and its mean margin loss."""
+    solver = TrapSolver(size, non_crossing=non_crossing)
+    rng = random.Random(seed)
+    stats = {name: {"positions": 0, "optimal": 0, "loss": 0, "blunders": 0} for name in players}
+    for _ in range(positions):
+        state = random_position(size, plies, rng, non_crossing)
+        values = solver.move_values(*solver.position(state, 0))
+        if len(values) < 2:
+            continue
+        best = max(values.values())
+        for name in players:
+            move = PLAYERS[name](state, 0, random.Random(rng.random()))
+            value = values[solver.board.index[move]]
+            s = stats[name]
+            s["positions"] += 1
+            s["optimal"] += value == best
+            s["loss"] += best - value
+            # A blunder turns a win or draw into a worse outcome
+            s["blunders"] += (value > 0) - (value < 0) < (best > 0) - (best < 0)
+    return stats, solver
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve two-knight longest-path positions exactly.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("label", "grade"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--size", type=int, default=5)
+        cmd.add_argument("--positions", type=int, default=100)
+        cmd.add_argument("--plies", type=int, default=4, help="random opening moves per side")
+        cmd.add_argument("--seed", type=int, default=0)
+        cmd.add_argument("--non-crossing", action="store_true")
+    sub.choices["grade"].add_argument("--players", nargs="+", choices=list(PLAYERS), default=None)
+    args = parser.parse_args(argv)
+
+    t0 = time.time()
+    if args.command == "label":
+        for record in label(args.size, args.positions, args.plies, args.seed, args.non_crossing):
+            print(json.dumps(record))
+        print(f"{args.positions} positions in {time.time() - t0:.1f}s", file=sys.stderr)
+    else:
+        players = args.players or (["metaheuristic"] if args.non_crossing else list(PLAYERS))
+        stats, solver = grade(args.size, args.positions, args.plies, players, args.seed, args.non_crossing)
+        print(f"{'player':<14} {'positions':>9} {'optimal%':>9} {'mean loss':>9} {'blunder%':>9}")
+        for name, s in stats.items():
+            n = max(1, s["positions"])
+            print(f"{name:<14} {s['positions']:9} {100 * s['optimal'] / n:9.1f} {s['loss'] / n:9.2f} "
+                  f"{100 * s['blunders'] / n:9.1f}")
+        print(f"{solver.nodes} nodes, {len(solver.table)} table entries, {time.time() - t0:.1f}s")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Parallel Monte Carlo trial runner shared by the duel experiments.
+
+Randomness never comes from the global random module. Each trial gets a seed
+derived from (master seed, experiment, trial index), and the trial derives one
+random.Random stream per consumer from it (start squares, each knight's
+heuristic, ...) with make_rng. A trial's outcome therefore does not depend on
+which worker ran it, what ran before it, or how many numbers another heuristic
+drew, and results are bit-identical for any worker count. Trials are sharded
+into chunks; each worker sends back a Counter of trial outcomes per chunk and
+the chunks are merged as they arrive.
+"""
+
+import hashlib
+import os
+import random
+from collections import Counter
+from multiprocessing import Pool
+
+import instrument
+
+def derive_seed(*key):
+    """64-bit seed derived from a key such as (master seed, experiment, trial)."""
+    digest = hashlib.sha256(":".join(str(part) for part in key).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def make_rng(*key):
+    """Independent random.Random stream for a key, e.g. make_rng(seed, "k2", name)."""
+    return random.Random(derive_seed(*key))
+
+def _run_chunk(args):
+    trial_func, master_seed, experiment, start, stop = args
+    outcomes = Counter()
+    for trial in range(start, stop):
+        outcomes[trial_func(trial, derive_seed(master_seed, experiment, trial))] += 1
+    return outcomes
+
+def run_trials(trial_func, trials, seed=None, experiment="", workers=None, chunk_size=None, on_progress=None):
+    """Run trial_func(trial_index, trial_seed) for every trial and count the outcomes.
+
+    trial_func must be a picklable (module-level) function returning a
+    hashable outcome, e.g. a (k1_len, k2_len) tuple, and should draw all its
+    randomness from make_rng(trial_seed, ...). With seed=None a fresh master
+    seed is drawn. on_progress(done, trials, outcomes) is called with the
+    merged Counter after each chunk arrives.
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(1 << 63)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if instrument.enabled():
+        # Instrumentation counts are per process
+        workers = 1
+    if chunk_size is None:
+        chunk_size = max(1, min(250, trials // (workers * 8)))
+    chunks = [
+        (trial_func, seed, experiment, start, min(start + chunk_size, trials))
+        for start in range(0, trials, chunk_size)
+    ]
+
+    outcomes = Counter()
+    done = 0
+    if workers <= 1:
+        partials = map(_run_chunk, chunks)
+        pool = None
+    else:
+        pool = Pool(workers)
+        partials = pool.imap_unordered(_run_chunk, chunks)
+    try:
+        for partial in partials:
+            outcomes.update(partial)
+            done += sum(partial.values())
+            if on_progress is not None:
+                on_progress(done, trials, outcomes)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return outcomes